@@ -13,14 +13,20 @@ import json
 import os
 from datetime import datetime, timedelta
 from utils import (
-    ingest_and_clean,
-    extract_skills,
-    compute_user_vector,
-    match_roles,
+    extract_document_isolated,
+    analyze_text,
+    IncrementalRoleScorer,
+    recommend_next_skills,
+    plan_course_bundle,
+    plan_learning_path,
+    load_skill_ontology,
     recommend_bridges,
     generate_skill_passport,
     create_pdf_passport,
     get_skill_names,
+    get_role_index,
+    start_model_warmup,
+    get_model_status,
     get_demographic_profile,
     calculate_equity_adjusted_salary,
     enhance_skills_with_confidence,
@@ -34,6 +40,17 @@ from utils import (
 # HELPER FUNCTIONS FOR NEW FEATURES
 # ============================================================================
 
+@st.cache_resource
+def load_role_index():
+    """Load the role vector index once per server process"""
+    return get_role_index()
+
+@st.cache_resource
+def warm_up_model():
+    """Start loading the embedding model in the background once per server process"""
+    start_model_warmup()
+    return True
+
 @st.cache_data
 def load_women_in_ai_data():
     """Load women leaders, mentors, and hub data"""
@@ -401,6 +418,8 @@ st.markdown("""
 
 if 'text' not in st.session_state:
     st.session_state.text = ""
+if 'uploaded_extraction' not in st.session_state:
+    st.session_state.uploaded_extraction = {}
 if 'recognized_skills' not in st.session_state:
     st.session_state.recognized_skills = []
 if 'user_vector' not in st.session_state:
@@ -420,6 +439,10 @@ if 'current_page' not in st.session_state:
 if 'visited_pages' not in st.session_state:
     st.session_state.visited_pages = set()
 
+# Load the role vector index up front so role matching is a single matrix product
+load_role_index()
+warm_up_model()
+
 # ============================================================================
 # HEADER
 # ============================================================================
@@ -525,6 +548,13 @@ st.session_state.anonymous_mode = anonymous_mode
 if anonymous_mode:
     st.sidebar.info("🔒 Anonymous mode active: Demographic info will not influence recommendations")
 
+# Embedding model readiness
+model_status = get_model_status()
+if model_status['status'] == 'loading':
+    st.sidebar.caption("⏳ AI model is warming up - the first analysis may take a moment")
+elif model_status['status'] == 'failed':
+    st.sidebar.caption("⚠️ AI model could not be loaded")
+
 # ============================================================================
 # SCROLL TO TOP ON PAGE CHANGE
 # ============================================================================
@@ -860,20 +890,29 @@ elif page == "📄 Upload Your CV":
     if input_method == "📤 Upload File":
         uploaded_file = st.file_uploader("Upload your CV (PDF/TXT)", type=['pdf', 'txt'], key="cv_uploader")
         if uploaded_file:
-            try:
-                if uploaded_file.type == "text/plain":
-                    st.session_state.text = uploaded_file.read().decode('utf-8')
-                else:
-                    st.session_state.text = ingest_and_clean(uploaded_file)
+            # Streamlit reruns this script on every interaction; extract each upload only once
+            if st.session_state.uploaded_extraction.get('file_id') != uploaded_file.file_id:
+                try:
+                    if uploaded_file.type == "text/plain":
+                        extracted_text = uploaded_file.read().decode('utf-8')
+                    else:
+                        extracted_text = extract_document_isolated(uploaded_file)
+                    st.session_state.uploaded_extraction = {'file_id': uploaded_file.file_id, 'text': extracted_text, 'error': None}
+                except Exception as e:
+                    st.session_state.uploaded_extraction = {'file_id': uploaded_file.file_id, 'text': None, 'error': str(e)}
+            
+            extraction = st.session_state.uploaded_extraction
+            if extraction['error'] is None:
+                st.session_state.text = extraction['text']
                 st.success("✅ File uploaded successfully!")
                 with st.expander("View extracted text"):
                     st.text_area("Content", st.session_state.text, height=200, key="extracted_text_preview")
-            except Exception as e:
-                st.error(f"❌ Error processing file: {str(e)}")
+            else:
+                st.error(f"❌ Error processing file: {extraction['error']}")
                 st.info("💡 Try one of these solutions:")
                 st.markdown("""
                 - **Use 'Paste Text' instead**: Copy your resume text and paste it directly
-                - **Check file size**: Ensure your file is under 200MB
+                - **Check file size**: Ensure your file is under 25MB
                 - **Try a different format**: Convert PDF to TXT if having issues
                 - **Refresh the page**: Press Ctrl+R or F5 and try again
                 """)
@@ -918,23 +957,11 @@ elif page == "📄 Upload Your CV":
                     import re
                     text_to_analyze = re.sub(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b', '[REDACTED]', text_to_analyze)
                 
-                skills = extract_skills(text_to_analyze)
-                st.session_state.recognized_skills = skills
-                
-                # Combine all skill IDs for vector computation
-                all_skill_ids = []
-                if isinstance(skills, dict):
-                    all_skill_ids = skills.get('hard_skills', []) + skills.get('soft_skills', [])
-                else:
-                    # Fallback for old format
-                    all_skill_ids = skills
-                
-                st.session_state.user_vector = compute_user_vector(all_skill_ids)
-                
-                # Get skill names for match_roles function
-                skill_names = get_skill_names(all_skill_ids)
-                matches = match_roles(st.session_state.user_vector, skill_names)
-                st.session_state.matches = matches
+                # Skills, user vector and role matches (cached per document text)
+                analysis = analyze_text(text_to_analyze)
+                st.session_state.recognized_skills = analysis['skills']
+                st.session_state.user_vector = analysis['user_vector']
+                st.session_state.matches = analysis['matches']
                 st.success("✅ Analysis complete!")
                 
                 # Next step guidance
@@ -1254,6 +1281,39 @@ elif page == "✨ Your Strengths":
             else:
                 st.info("No soft skills detected. Try uploading a more detailed CV.")
         
+        # Let users correct the detected skills; role scores update incrementally
+        if isinstance(skills, dict):
+            with st.expander("✏️ Edit your skills"):
+                ontology = load_skill_ontology()
+                name_to_id = {s['name']: s['id'] for s in ontology['hard_skills'] + ontology['soft_skills']}
+                soft_ids = {s['id'] for s in ontology['soft_skills']}
+                
+                selected = st.multiselect(
+                    "Add or remove skills",
+                    options=list(name_to_id),
+                    default=[name for name in all_skill_names if name in name_to_id]
+                )
+                
+                if set(selected) != set(all_skill_names):
+                    scorer = st.session_state.get('skill_scorer')
+                    if scorer is None or set(scorer.skills) != set(all_skill_names):
+                        scorer = IncrementalRoleScorer(all_skill_names)
+                    for name in all_skill_names:
+                        if name not in selected:
+                            scorer.remove_skill(name)
+                    for name in selected:
+                        scorer.add_skill(name)
+                    
+                    selected_ids = [name_to_id[name] for name in selected]
+                    st.session_state.skill_scorer = scorer
+                    st.session_state.recognized_skills = {
+                        'hard_skills': [sid for sid in selected_ids if sid not in soft_ids],
+                        'soft_skills': [sid for sid in selected_ids if sid in soft_ids]
+                    }
+                    st.session_state.user_vector = scorer.user_vector()
+                    st.session_state.matches = scorer.matches()
+                    st.rerun()
+        
         # Industry translation if industry selected
         if st.session_state.industry_selection:
             st.markdown("---")
@@ -1451,7 +1511,7 @@ elif page == "📈 Gap Analysis":
             st.markdown("---")
             st.markdown("### 🎓 Recommended Learning Resources")
             
-            bridges = recommend_bridges(list(gaps), user_skill_names)
+            bridges = recommend_bridges(list(gaps), user_skill_names, limit=5)
             for bridge in bridges[:5]:
                 st.markdown(f"""
                 <div style="background: white; border: 2px solid #e5e7eb; padding: 1.5rem; 
@@ -1475,6 +1535,40 @@ elif page == "📈 Gap Analysis":
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
+        
+        # Fewest hours that close every gap for this role
+        if gaps:
+            bundle = plan_course_bundle(list(gaps), all_skill_ids if isinstance(user_skills_dict, dict) else [])
+            if bundle['courses']:
+                st.markdown("---")
+                st.markdown("### 📦 Fastest Course Bundle")
+                total_cost = 'Free' if bundle['total_cost'] == 0 else f"${bundle['total_cost']:.0f}"
+                st.markdown(f"**{len(bundle['courses'])} courses · {bundle['total_hours']:.0f} hours · {total_cost}**")
+                for course in bundle['courses']:
+                    st.markdown(f"• **{course['course_name']}** ({course['duration_hours']}h) — {', '.join(course['fills_gaps'])}")
+                if bundle['uncovered']:
+                    st.caption(f"No course in the catalog teaches: {', '.join(bundle['uncovered'])}")
+        
+        # Step-by-step route through course prerequisites to this role's gaps
+        if gaps and isinstance(user_skills_dict, dict):
+            path = plan_learning_path(all_skill_ids, list(gaps))
+            if path['steps']:
+                st.markdown("---")
+                st.markdown("### 🧭 Your Learning Path")
+                st.markdown(f"**{len(path['steps'])} steps · {path['total_hours']:.0f} hours in total**")
+                for step_no, step in enumerate(path['steps'], 1):
+                    after = f" (builds on {', '.join(get_skill_names([step['requires']]))})" if step['requires'] else ""
+                    st.markdown(f"{step_no}. **{step['course_name']}** — {step['duration_hours']}h{after}")
+        
+        # Skills that would raise this role's match score the most
+        if gaps and isinstance(user_skills_dict, dict):
+            st.markdown("---")
+            st.markdown("### 🚀 What to Learn Next")
+            
+            next_skills = recommend_next_skills(all_skill_ids, top_n=3, target_roles=[role_data['role_id']])
+            for item in next_skills:
+                courses = ', '.join(course['course_name'] for course in item['courses'][:2]) or 'No matching course yet'
+                st.markdown(f"• **{item['skill_name']}** (+{item['gain'] * 100:.1f} match points) — {courses}")
 
 # ============================================================================
 # ============================================================================
@@ -1521,10 +1615,10 @@ elif page == "🪪 Digital Passport":
                     user_skill_names = get_skill_names(all_skill_ids)
                     gaps = top_roles[0].get('gaps', []) if top_roles else []
                     if gaps:
-                        bridges = recommend_bridges(list(gaps), user_skill_names)[:5]
+                        bridges = recommend_bridges(list(gaps), user_skill_names, limit=5)
                 
                 # Generate passport
-                json_path, passport_data = generate_skill_passport(
+                json_buffer, passport_data = generate_skill_passport(
                     user_data,
                     skills,
                     top_roles,
@@ -1555,27 +1649,24 @@ elif page == "🪪 Digital Passport":
                 # Generate PDF immediately
                 with st.spinner("Creating PDF..."):
                     demographic_info = st.session_state.demographic_info if st.session_state.demographic_info else {}
-                    pdf_path = create_pdf_passport(st.session_state.passport_data, demographic_info)
+                    pdf_buffer = create_pdf_passport(st.session_state.passport_data, demographic_info)
                 
                 # Download options
                 col1, col2 = st.columns(2)
                 with col1:
                     st.download_button(
                         "📥 Download JSON",
-                        data=json.dumps(st.session_state.passport_data, indent=2),
+                        data=json_buffer.getvalue(),
                         file_name="skill_passport.json",
                         mime="application/json",
                         use_container_width=True
                     )
                 with col2:
-                    if pdf_path and os.path.exists(pdf_path):
-                        # Read PDF file for download
-                        with open(pdf_path, "rb") as pdf_file:
-                            pdf_bytes = pdf_file.read()
-                        
+                    if pdf_buffer is not None:
+                        # Rendered in memory for this session only
                         st.download_button(
                             "📄 Download PDF",
-                            data=pdf_bytes,
+                            data=pdf_buffer.getvalue(),
                             file_name="ai_skills_passport.pdf",
                             mime="application/pdf",
                             type="primary",
@@ -0,0 +1,369 @@
+"""
+Bulk CV processing for the Skill Recognition Engine
+
+Runs the full pipeline (ingest -> skills -> user vector -> role matches ->
+bridge courses) over a directory or tarball of PDF, DOCX and TXT CVs in a
+process pool and streams one JSON line per CV.
+
+Progress is checkpointed next to the output file, so re-running the same
+command after an interruption resumes where it stopped. A manifest with the
+catalog and model versions is written when the job completes.
+
+Usage:
+    python batch_process.py cvs/ -o results.jsonl
+    python batch_process.py partner_upload.tar.gz -o results.jsonl --workers 4
+    python batch_process.py cvs/ -o results.jsonl --restart
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tarfile
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+# Disable TensorFlow to avoid compatibility issues
+os.environ.setdefault('USE_TF', 'NO')
+os.environ.setdefault('TRANSFORMERS_NO_TF', '1')
+
+import utils
+
+SUPPORTED_TYPES = {'.pdf': 'pdf', '.docx': 'docx', '.txt': 'txt'}
+STAGES = ['ingest', 'extract_skills', 'user_vector', 'match_roles', 'recommend_bridges']
+
+
+def pipeline_versions() -> dict:
+    """Catalog and model versions that determine a batch job's results"""
+    return {
+        'skill_ontology': utils.catalog_version("data/skill_ontology.json"),
+        'role_clusters': utils.catalog_version("data/ai_role_clusters.json"),
+        'microcredentials': utils.catalog_version("data/microcredentials.json"),
+        'embedding_model': utils.embedding_model_id()
+    }
+
+
+def _write_json_atomic(path: str, data: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(output_path: str, versions: dict) -> dict:
+    """
+    Load the checkpoint of an interrupted job writing to output_path
+    
+    Raises:
+        ValueError: The catalogs or model changed since the checkpoint was written
+    """
+    checkpoint_path = f"{output_path}.checkpoint.json"
+    if not os.path.exists(checkpoint_path) or not os.path.exists(output_path):
+        return {'output_bytes': 0, 'completed': [], 'failed': []}
+    
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('versions') != versions:
+        raise ValueError(
+            f"Catalog or model versions changed since {checkpoint_path} was written; "
+            "rerun with --restart to start over"
+        )
+    checkpoint.setdefault('failed', [])
+    return checkpoint
+
+
+def iter_documents(source: str):
+    """Yield (name, bytes) for every supported CV in a directory or tarball"""
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for filename in sorted(files):
+                if os.path.splitext(filename)[1].lower() in SUPPORTED_TYPES:
+                    path = os.path.join(root, filename)
+                    with open(path, 'rb') as f:
+                        yield os.path.relpath(path, source), f.read()
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source) as tar:
+            for member in tar:
+                if member.isfile() and os.path.splitext(member.name)[1].lower() in SUPPORTED_TYPES:
+                    yield member.name, tar.extractfile(member).read()
+    else:
+        raise ValueError(f"{source} is neither a directory nor a tar archive")
+
+
+def _init_worker():
+    """Load catalogs and embedding indexes once per worker process"""
+    utils.get_role_index()
+    utils.get_skill_embedding_table()
+
+
+def _new_pool(workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+
+def _failure_record(document: tuple, error: str) -> dict:
+    """Error record for a document whose worker never returned a result"""
+    name, data, digest = document
+    return {'file': name, 'sha256': digest, 'status': 'error', 'error': error, 'timings': {}}
+
+
+def process_document(name: str, data: bytes, digest: str = None) -> dict:
+    """Run the full pipeline for one CV and return its JSON record"""
+    record = {'file': name, 'sha256': digest or hashlib.sha256(data).hexdigest(), 'status': 'ok'}
+    timings = {}
+    
+    try:
+        start = time.perf_counter()
+        file_type = SUPPORTED_TYPES[os.path.splitext(name)[1].lower()]
+        # Parse in a separate, time- and memory-limited process so a
+        # pathological document cannot hang or crash this worker
+        text = utils.extract_document_isolated(BytesIO(data), file_type)
+        timings['ingest'] = time.perf_counter() - start
+        if not text:
+            raise ValueError("no text could be extracted")
+        
+        start = time.perf_counter()
+        skills = utils.extract_skills(text)
+        skill_ids = skills['hard_skills'] + skills['soft_skills']
+        timings['extract_skills'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        user_vector = utils.compute_user_vector(skill_ids)
+        timings['user_vector'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        matches = utils.match_roles(user_vector, skill_ids)
+        timings['match_roles'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        gaps = matches[0]['gaps'] if matches else []
+        bridges = utils.recommend_bridges(gaps, skill_ids, limit=5)
+        timings['recommend_bridges'] = time.perf_counter() - start
+        
+        record.update({
+            'skills': skills,
+            'skill_names': utils.get_skill_names(skill_ids),
+            'top_roles': [
+                {
+                    'role_id': m['role_id'],
+                    'role_name': m['role_name'],
+                    'combined_score': m['combined_score'],
+                    'similarity': m['similarity'],
+                    'coverage': m['coverage'],
+                    'matched_skills': m['matched_skills'],
+                    'gaps': m['gaps']
+                } for m in matches
+            ],
+            'bridges': [
+                {
+                    'course_id': c['course_id'],
+                    'course_name': c['course_name'],
+                    'fills_gaps': c['fills_gaps'],
+                    'duration_hours': c['duration_hours'],
+                    'cost': c['cost']
+                } for c in bridges
+            ]
+        })
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = f"{type(e).__name__}: {e}"
+    
+    record['timings'] = timings
+    return record
+
+
+def run_batch(source: str, output_path: str, workers: int = None,
+              restart: bool = False, checkpoint_every: int = 50) -> dict:
+    """
+    Process every CV under source and stream JSON lines to output_path
+    
+    Completed document hashes and the committed size of the output file are
+    checkpointed every checkpoint_every records. On resume, anything written
+    after the last checkpoint is truncated and those documents are redone.
+    Only successful documents count as completed: documents that failed are
+    retried on resume, and their new record follows the earlier error record.
+    If a worker process dies, the documents it had in flight are rerun one at
+    a time in a fresh pool and the one that crashes it is recorded as an error.
+    
+    Returns:
+        Summary with document counts, throughput and per-stage timing totals
+    """
+    workers = workers or os.cpu_count() or 1
+    checkpoint_path = f"{output_path}.checkpoint.json"
+    versions = pipeline_versions()
+    started_at = datetime.now(timezone.utc).isoformat()
+    
+    checkpoint = {'output_bytes': 0, 'completed': [], 'failed': []} if restart else load_checkpoint(output_path, versions)
+    completed = set(checkpoint['completed'])
+    failed = set(checkpoint['failed'])
+    previously_failed = set(failed)
+    resumed = len(completed)
+    
+    stage_totals = {stage: 0.0 for stage in STAGES}
+    counts = {'ok': 0, 'error': 0, 'skipped': 0, 'retried': 0}
+    started = time.perf_counter()
+    
+    with open(output_path, 'r+b' if os.path.exists(output_path) else 'wb') as out:
+        # Drop records written after the last checkpoint; they will be redone
+        out.truncate(checkpoint['output_bytes'])
+        out.seek(0, os.SEEK_END)
+        since_checkpoint = 0
+        
+        def commit():
+            out.flush()
+            os.fsync(out.fileno())
+            _write_json_atomic(checkpoint_path, {
+                'output_bytes': out.tell(),
+                'completed': sorted(completed),
+                'failed': sorted(failed),
+                'versions': versions
+            })
+        
+        pool = _new_pool(workers)
+        in_flight = {}
+        
+        def write(record):
+            nonlocal since_checkpoint
+            counts[record['status']] += 1
+            for stage, seconds in record['timings'].items():
+                stage_totals[stage] += seconds
+            out.write((json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8'))
+            digest = record['sha256']
+            if digest in previously_failed:
+                counts['retried'] += 1
+            if record['status'] == 'ok':
+                completed.add(digest)
+                failed.discard(digest)
+            else:
+                failed.add(digest)
+            since_checkpoint += 1
+            if since_checkpoint >= checkpoint_every:
+                commit()
+                since_checkpoint = 0
+        
+        def rebuild_pool():
+            nonlocal pool
+            pool.shutdown(wait=False, cancel_futures=True)
+            pool = _new_pool(workers)
+        
+        def isolate(documents):
+            # A worker died while these were in flight; rerun them one at a
+            # time so only the document that kills a worker is recorded as failed
+            for document in documents:
+                try:
+                    record = pool.submit(process_document, *document).result()
+                except BrokenProcessPool as e:
+                    record = _failure_record(document, f"worker process crashed ({e})")
+                    rebuild_pool()
+                write(record)
+        
+        def drain():
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            crashed = []
+            for future in done:
+                document = in_flight.pop(future)
+                try:
+                    record = future.result()
+                except BrokenProcessPool:
+                    crashed.append(document)
+                    continue
+                except Exception as e:
+                    record = _failure_record(document, f"{type(e).__name__}: {e}")
+                write(record)
+            if crashed:
+                crashed.extend(in_flight.values())
+                in_flight.clear()
+                rebuild_pool()
+                isolate(crashed)
+        
+        try:
+            # Keep a bounded number of documents in flight so memory stays flat
+            for name, data in iter_documents(source):
+                digest = hashlib.sha256(data).hexdigest()
+                if digest in completed:
+                    counts['skipped'] += 1
+                    continue
+                in_flight[pool.submit(process_document, name, data, digest)] = (name, data, digest)
+                if len(in_flight) >= workers * 4:
+                    drain()
+            while in_flight:
+                drain()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        
+        commit()
+    
+    elapsed = time.perf_counter() - started
+    total = counts['ok'] + counts['error']
+    summary = {
+        'documents': total,
+        'ok': counts['ok'],
+        'errors': counts['error'],
+        'skipped': counts['skipped'],
+        'retried': counts['retried'],
+        'resumed_with': resumed,
+        'elapsed_seconds': elapsed,
+        'documents_per_second': total / elapsed if elapsed > 0 else 0.0,
+        'stage_seconds': stage_totals
+    }
+    
+    _write_json_atomic(f"{output_path}.manifest.json", {
+        'source': os.path.abspath(source),
+        'output': os.path.abspath(output_path),
+        'started_at': started_at,
+        'finished_at': datetime.now(timezone.utc).isoformat(),
+        'versions': versions,
+        'model_free': utils.is_model_free(),
+        'records': len(completed),
+        'failed': len(failed),
+        'summary': summary
+    })
+    return summary
+
+
+def print_summary(summary: dict, out=sys.stderr):
+    print(f"Processed {summary['documents']} CVs ({summary['ok']} ok, {summary['errors']} errors) "
+          f"in {summary['elapsed_seconds']:.1f}s - {summary['documents_per_second']:.1f} CVs/s", file=out)
+    if summary['skipped']:
+        print(f"Skipped {summary['skipped']} CVs already completed in a previous run", file=out)
+    if summary['retried']:
+        print(f"Retried {summary['retried']} CVs that failed in a previous run", file=out)
+    print("Stage timing (summed across workers):", file=out)
+    for stage, seconds in summary['stage_seconds'].items():
+        mean_ms = 1000 * seconds / summary['documents'] if summary['documents'] else 0.0
+        print(f"  {stage:<18} {seconds:8.2f}s total  {mean_ms:8.2f} ms/CV", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the skill pipeline over a batch of CVs")
+    parser.add_argument('source', help="Directory or tarball of PDF/DOCX/TXT CVs")
+    parser.add_argument('-o', '--output', required=True, help="Output JSONL file")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Worker processes (default: CPU count; each loads its own model unless MODEL_FREE=1)")
+    parser.add_argument('--restart', action='store_true',
+                        help="Ignore any checkpoint and start the job from scratch")
+    parser.add_argument('--checkpoint-every', type=int, default=50,
+                        help="Records between checkpoints (default: 50)")
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.source):
+        parser.error(f"{args.source} does not exist")
+    if not os.path.isdir(args.source) and not tarfile.is_tarfile(args.source):
+        parser.error(f"{args.source} is neither a directory nor a tar archive")
+    
+    try:
+        summary = run_batch(args.source, args.output, args.workers,
+                            restart=args.restart, checkpoint_every=args.checkpoint_every)
+    except ValueError as e:
+        parser.error(str(e))
+    print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
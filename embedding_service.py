@@ -0,0 +1,207 @@
+"""
+Shared embedding sidecar for the Skill Recognition Engine
+
+One process owns the embedding model and serves encode requests over a Unix
+domain socket, so several Streamlit servers share a single copy of the model.
+Point utils at it with EMBEDDING_SOCKET=/path/to/socket.
+
+Wire protocol (big-endian, one request/response at a time per connection):
+    greeting: on connect the service sends uint32 length, then the UTF-8
+              model id it serves (utils.embedding_model_id())
+    request:  uint32 count, then count x (uint32 length, UTF-8 bytes)
+    response: uint8 status, uint32 a, uint32 b, then
+              status 0: a x b little-endian float32 (rows x dim)
+              status 1: a bytes of UTF-8 error message
+
+Usage:
+    python embedding_service.py --socket /tmp/skill-engine-embed.sock
+"""
+
+import argparse
+import os
+import socket
+import socketserver
+import struct
+import threading
+
+DEFAULT_SOCKET = '/tmp/skill-engine-embed.sock'
+
+_COUNT = struct.Struct('>I')
+_HEADER = struct.Struct('>BII')
+
+
+def _recv_exact(sock, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("embedding service closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def encode_request(texts) -> bytes:
+    parts = [_COUNT.pack(len(texts))]
+    for text in texts:
+        data = text.encode('utf-8')
+        parts.append(_COUNT.pack(len(data)))
+        parts.append(data)
+    return b''.join(parts)
+
+
+def encode_greeting(model_id: str) -> bytes:
+    data = model_id.encode('utf-8')
+    return _COUNT.pack(len(data)) + data
+
+
+def read_greeting(sock) -> str:
+    """Read the model id the service announces on connect"""
+    length, = _COUNT.unpack(_recv_exact(sock, _COUNT.size))
+    return _recv_exact(sock, length).decode('utf-8')
+
+
+def read_request(sock):
+    """Read one request; returns None when the client has disconnected"""
+    first = sock.recv(_COUNT.size)
+    if not first:
+        return None
+    count, = _COUNT.unpack(first + _recv_exact(sock, _COUNT.size - len(first)))
+    texts = []
+    for _ in range(count):
+        length, = _COUNT.unpack(_recv_exact(sock, _COUNT.size))
+        texts.append(_recv_exact(sock, length).decode('utf-8'))
+    return texts
+
+
+class SocketEncoder:
+    """
+    Client for the embedding sidecar with the SentenceTransformer encode() interface
+    
+    Each thread keeps its own connection and reconnects once if the service
+    was restarted. Connecting fails if the service announces a different
+    model id than model_id, so vectors from different models never end up in
+    the same caches and indexes. Every socket operation is bounded by timeout
+    seconds, so a hung service raises instead of stalling the caller.
+    """
+    
+    def __init__(self, path: str = DEFAULT_SOCKET, model_id: str = None, timeout: float = None):
+        self.path = path
+        self.model_id = model_id
+        self.timeout = timeout
+        self._local = threading.local()
+    
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+                served = read_greeting(sock)
+            except BaseException:
+                sock.close()
+                raise
+            if self.model_id is not None and served != self.model_id:
+                sock.close()
+                raise RuntimeError(
+                    f"Embedding service at {self.path} serves {served!r} but this process "
+                    f"expects {self.model_id!r}; start it with the same EMBEDDING_BACKEND"
+                )
+            self._local.sock = sock
+        return sock
+    
+    def _close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+    
+    def _round_trip(self, texts):
+        import numpy as np
+        sock = self._connection()
+        sock.sendall(encode_request(texts))
+        status, a, b = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+        if status != 0:
+            message = _recv_exact(sock, a).decode('utf-8', errors='replace')
+            raise RuntimeError(f"Embedding service error: {message}")
+        return np.frombuffer(_recv_exact(sock, a * b * 4), dtype='<f4').reshape(a, b)
+    
+    def encode(self, sentences, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        try:
+            embeddings = self._round_trip(texts)
+        except (ConnectionError, BrokenPipeError, FileNotFoundError, ConnectionRefusedError):
+            self._close()
+            embeddings = self._round_trip(texts)
+        except socket.timeout:
+            # The reply may still arrive later, so this connection is out of sync
+            self._close()
+            raise
+        return embeddings[0] if single else embeddings
+
+
+class _EncodeHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        import numpy as np
+        import utils
+        
+        try:
+            self.request.sendall(encode_greeting(utils.embedding_model_id()))
+        except OSError:
+            return
+        
+        while True:
+            try:
+                texts = read_request(self.request)
+            except (ConnectionError, UnicodeDecodeError):
+                return
+            if texts is None:
+                return
+            
+            try:
+                embeddings = np.ascontiguousarray(utils.encode_texts(texts), dtype='<f4')
+                response = _HEADER.pack(0, *embeddings.shape) + embeddings.tobytes()
+            except Exception as e:
+                message = f"{type(e).__name__}: {e}".encode('utf-8')
+                response = _HEADER.pack(1, len(message), 0) + message
+            self.request.sendall(response)
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(path: str = DEFAULT_SOCKET):
+    """Load the model once and serve encode requests on a Unix socket"""
+    # This process owns the model, so never forward encodes to a socket itself
+    os.environ['EMBEDDING_SOCKET'] = ''
+    import utils
+    
+    if utils.is_model_free():
+        raise SystemExit("The embedding service needs the model; unset MODEL_FREE")
+    utils.get_embedding_model()
+    
+    if os.path.exists(path):
+        os.unlink(path)
+    with EmbeddingServer(path, _EncodeHandler) as server:
+        print(f"Embedding service ({utils.embedding_model_id()}) listening on {path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve embeddings over a Unix domain socket")
+    parser.add_argument('--socket', default=os.environ.get('EMBEDDING_SOCKET') or DEFAULT_SOCKET,
+                        help=f"Socket path (default: $EMBEDDING_SOCKET or {DEFAULT_SOCKET})")
+    args = parser.parse_args()
+    serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
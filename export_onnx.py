@@ -0,0 +1,178 @@
+"""
+Export the embedding model to ONNX for the onnx / onnx-int8 backends
+
+Writes model.onnx, a dynamically int8-quantised model.int8.onnx and the
+tokenizer to ONNX_MODEL_DIR, then reports the cosine drift of both against
+the PyTorch baseline on the catalog texts, along with each backend's cold
+load time and peak memory.
+
+Usage:
+    python export_onnx.py
+    python export_onnx.py --report-only
+
+Then run the app with EMBEDDING_BACKEND=onnx or EMBEDDING_BACKEND=onnx-int8.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Disable TensorFlow to avoid compatibility issues
+os.environ.setdefault('USE_TF', 'NO')
+os.environ.setdefault('TRANSFORMERS_NO_TF', '1')
+
+# The export and the baseline both need the PyTorch model
+os.environ['MODEL_FREE'] = '0'
+os.environ['EMBEDDING_BACKEND'] = 'torch'
+
+import utils
+
+
+def export(model_dir: str):
+    """Export the transformer to ONNX and write an int8-quantised copy"""
+    import torch
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    
+    os.makedirs(model_dir, exist_ok=True)
+    st_model = utils.get_embedding_model()
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+    tokenizer.save_pretrained(model_dir)
+    
+    dummy = tokenizer(["machine learning", "data analysis with python"], padding=True, return_tensors='pt')
+    inputs = ['input_ids', 'attention_mask', 'token_type_ids']
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in inputs + ['last_hidden_state']}
+    
+    model_path = os.path.join(model_dir, 'model.onnx')
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(dummy[name] for name in inputs),
+            model_path,
+            input_names=inputs,
+            output_names=['last_hidden_state', 'pooler_output'],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            dynamo=False
+        )
+    print(f"Exported {model_path}")
+    
+    int8_path = os.path.join(model_dir, 'model.int8.onnx')
+    quantize_dynamic(model_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"Quantised {int8_path}")
+
+
+def _catalog_texts():
+    ontology = utils.load_skill_ontology()
+    texts = [skill['name'] for skill in ontology['hard_skills'] + ontology['soft_skills']]
+    texts += [keyword for skill in ontology['hard_skills'] + ontology['soft_skills'] for keyword in skill['keywords']]
+    texts += [role['description'] for role in utils.load_role_clusters()]
+    texts += [course['description'] for course in utils.load_microcredentials()]
+    return texts
+
+
+def _load_backend(backend: str, model_dir: str):
+    if backend == 'torch':
+        return utils.get_embedding_model()
+    return utils.OnnxSentenceEncoder(model_dir, quantized=(backend == 'onnx-int8'))
+
+
+def _peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def measure_load(backend: str, model_dir: str) -> dict:
+    """Cold load time and peak RSS of a backend, measured in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--measure-load', backend, '--model-dir', model_dir],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _measure_load_here(backend: str, model_dir: str) -> dict:
+    start = time.perf_counter()
+    encoder = _load_backend(backend, model_dir)
+    encoder.encode(["machine learning"])
+    return {'load_seconds': time.perf_counter() - start, 'rss_mb': _peak_rss_mb()}
+
+
+def drift_report(model_dir: str) -> dict:
+    """
+    Cosine drift, load time, memory and encode time of each backend versus torch
+    
+    Load time and peak RSS come from a fresh process per backend (import,
+    model load and one encode), so they are not hidden by a model this
+    process has already loaded; encode times are measured here, warm.
+    """
+    import numpy as np
+    texts = _catalog_texts()
+    report = {'texts': len(texts), 'backends': {}}
+    
+    baseline_model = _load_backend('torch', model_dir)
+    start = time.perf_counter()
+    baseline = np.asarray(baseline_model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+    encode_seconds = time.perf_counter() - start
+    report['backends']['torch'] = {
+        **measure_load('torch', model_dir),
+        'encode_seconds': encode_seconds
+    }
+    
+    for backend, filename in (('onnx', 'model.onnx'), ('onnx-int8', 'model.int8.onnx')):
+        encoder = _load_backend(backend, model_dir)
+        start = time.perf_counter()
+        embeddings = encoder.encode(texts)
+        encode_seconds = time.perf_counter() - start
+        
+        cosine = np.sum(embeddings * baseline, axis=1)
+        report['backends'][backend] = {
+            **measure_load(backend, model_dir),
+            'encode_seconds': encode_seconds,
+            'model_mb': os.path.getsize(os.path.join(model_dir, filename)) / 1024 / 1024,
+            'cosine_min': float(cosine.min()),
+            'cosine_mean': float(cosine.mean()),
+            'cosine_p5': float(np.percentile(cosine, 5))
+        }
+    
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX and report drift")
+    parser.add_argument('--model-dir', default=utils.ONNX_MODEL_DIR, help="Output directory")
+    parser.add_argument('--report-only', action='store_true', help="Skip the export, only report drift")
+    parser.add_argument('--measure-load', choices=utils.EMBEDDING_BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.measure_load:
+        # Child process of measure_load(): report a cold load as one JSON line
+        print(json.dumps(_measure_load_here(args.measure_load, args.model_dir)))
+        return
+    
+    if not args.report_only:
+        export(args.model_dir)
+    
+    report = drift_report(args.model_dir)
+    report_path = os.path.join(args.model_dir, 'drift_report.json')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    
+    print(f"\nCosine drift vs torch over {report['texts']} catalog texts:")
+    for backend, stats in report['backends'].items():
+        line = (f"  {backend:<10} load {stats['load_seconds']:6.2f}s  rss {stats['rss_mb']:7.1f} MB"
+                f"  encode {stats['encode_seconds']:6.2f}s")
+        if 'cosine_mean' in stats:
+            line += (f"  size {stats['model_mb']:6.1f} MB  cosine mean {stats['cosine_mean']:.5f}"
+                     f"  p5 {stats['cosine_p5']:.5f}  min {stats['cosine_min']:.5f}")
+        print(line)
+    print(f"Report written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
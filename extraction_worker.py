@@ -0,0 +1,55 @@
+"""
+Document extraction worker for utils.extract_document_isolated
+
+Runs as its own interpreter (never through multiprocessing), so the parent's
+__main__ - the Streamlit app - is not re-executed in the child. Reads the
+document from stdin, applies the memory limit before importing any parser,
+and writes one JSON object with the cleaned text or the error to stdout.
+
+Usage:
+    python extraction_worker.py pdf --max-pages 50 --time-limit 20 --memory-limit-mb 256 < cv.pdf
+"""
+
+import argparse
+import json
+import sys
+from io import BytesIO
+
+
+def _limit_memory(memory_limit_mb: int):
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract the cleaned text of one document from stdin")
+    parser.add_argument('file_type', choices=['pdf', 'docx', 'txt'])
+    parser.add_argument('--max-pages', type=int, default=None)
+    parser.add_argument('--time-limit', type=float, default=None)
+    parser.add_argument('--memory-limit-mb', type=int, default=0)
+    args = parser.parse_args()
+    
+    data = sys.stdin.buffer.read()
+    _limit_memory(args.memory_limit_mb)
+    
+    # stdout carries the result; send the parsers' progress messages to stderr
+    result_stream, sys.stdout = sys.stdout, sys.stderr
+    try:
+        import utils
+        text = utils._extract_text(BytesIO(data), args.file_type, args.max_pages, len(data), args.time_limit)
+        result = {'status': 'ok', 'text': text}
+    except BaseException as e:
+        result = {'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+    
+    result_stream.write(json.dumps(result))
+    result_stream.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Preload-then-fork multi-worker launcher for the Skill Recognition Engine
+
+Imports utils and loads the catalogs, role/skill indexes and embedding model
+once, then forks N Streamlit servers on separate local ports plus a small TCP
+load balancer on the public port. Workers share the read-only model weights
+and catalog lookups through copy-on-write pages instead of each loading their
+own copy. The balancer pins each browser to one worker with a cookie, since
+Streamlit sessions and uploads live on a single server.
+
+Run precompute.py first: the launcher refuses to start without its indexes,
+so the parent never runs model inference before forking and torch's thread
+pools stay out of the forked workers.
+
+Usage:
+    python launcher.py --workers 4 --port 8501
+    python launcher.py --workers 2 --port $PORT -- --server.maxUploadSize 25
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import signal
+import sys
+import time
+import traceback
+import zlib
+
+# Disable TensorFlow to avoid compatibility issues
+os.environ.setdefault('USE_TF', 'NO')
+os.environ.setdefault('TRANSFORMERS_NO_TF', '1')
+
+
+def preload_shared_state(load_model: bool = True):
+    """
+    Load everything the workers can share read-only before forking
+    
+    Raises:
+        RuntimeError: The precompute.py artefacts are missing; building them
+            here would load the model (and its threads) before the fork
+    """
+    import numpy as np
+    import utils
+    
+    missing = utils.missing_precomputed_indexes()
+    if missing:
+        raise RuntimeError(
+            f"Missing precomputed indexes: {', '.join(missing)}. "
+            "Run 'python precompute.py' before starting the launcher."
+        )
+    
+    utils.load_skill_ontology()
+    utils.load_role_clusters()
+    utils.load_microcredentials()
+    
+    # Build the derived lookups (name map, keyword automaton, role skill sets)
+    utils.get_skill_names([])
+    utils.extract_skills("")
+    utils.get_skill_embedding_table()
+    utils.get_role_index()
+    utils.match_roles(np.zeros(utils.EMBEDDING_DIM), [])
+    
+    if load_model and not utils.is_model_free() and not utils.EMBEDDING_SOCKET:
+        utils.get_embedding_model()
+    
+    # Keep the preloaded objects out of the collector's reach so that garbage
+    # collection in the workers does not dirty (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+
+def run_worker(app: str, port: int, streamlit_args):
+    """Child process: run a Streamlit server for app on a local port"""
+    from streamlit.web import cli as stcli
+    
+    sys.argv = [
+        'streamlit', 'run', app,
+        '--server.port', str(port),
+        '--server.address', '127.0.0.1',
+        '--server.headless', 'true',
+        *streamlit_args
+    ]
+    sys.exit(stcli.main())
+
+
+async def _pipe(reader, writer):
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+WORKER_COOKIE = 'skill_engine_worker'
+HEAD_LIMIT = 65536
+HEAD_TIMEOUT = 30
+
+
+async def _read_head(reader) -> bytes:
+    """Read at least the first HTTP message head (up to HEAD_LIMIT bytes)"""
+    head = b''
+    while b'\r\n\r\n' not in head and len(head) < HEAD_LIMIT:
+        data = await reader.read(HEAD_LIMIT)
+        if not data:
+            break
+        head += data
+    return head
+
+
+def _request_headers(head: bytes) -> dict:
+    """Lower-cased header names and values of a raw HTTP request head"""
+    headers = {}
+    for line in head.split(b'\r\n\r\n', 1)[0].split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        headers[name.strip().lower().decode('latin-1')] = value.strip().decode('latin-1')
+    return headers
+
+
+def _pinned_worker(headers: dict, n_workers: int):
+    """Worker index from the balancer's cookie, or None if absent or invalid"""
+    for cookie in headers.get('cookie', '').split(';'):
+        name, _, value = cookie.strip().partition('=')
+        if name == WORKER_COOKIE and value.isdigit() and int(value) < n_workers:
+            return int(value)
+    return None
+
+
+async def _balance(host: str, port: int, worker_ports):
+    active = [0] * len(worker_ports)
+    
+    async def handle(client_reader, client_writer):
+        # Streamlit keeps session state per server, and uploads must reach the
+        # server that owns the session. Behind a proxy every connection comes
+        # from the proxy's address, so pin browsers with a cookie instead: new
+        # clients are placed by X-Forwarded-For, or on the least busy worker
+        try:
+            head = await asyncio.wait_for(_read_head(client_reader), HEAD_TIMEOUT)
+        except (asyncio.TimeoutError, ConnectionError):
+            client_writer.close()
+            return
+        
+        headers = _request_headers(head)
+        pinned = _pinned_worker(headers, len(worker_ports))
+        start = pinned
+        if start is None:
+            forwarded_for = headers.get('x-forwarded-for', '').split(',')[0].strip()
+            if forwarded_for:
+                start = zlib.crc32(forwarded_for.encode()) % len(worker_ports)
+            else:
+                start = min(range(len(worker_ports)), key=active.__getitem__)
+        
+        for offset in range(len(worker_ports)):
+            index = (start + offset) % len(worker_ports)
+            try:
+                upstream_reader, upstream_writer = await asyncio.open_connection('127.0.0.1', worker_ports[index])
+                break
+            except OSError:
+                continue
+        else:
+            client_writer.close()
+            return
+        
+        async def respond():
+            if index != pinned:
+                # Add the (new) pin to the first response head on this connection
+                try:
+                    response = await _read_head(upstream_reader)
+                except ConnectionError:
+                    client_writer.close()
+                    return
+                status_end = response.find(b'\r\n')
+                if response.startswith(b'HTTP/') and status_end >= 0:
+                    cookie = f"Set-Cookie: {WORKER_COOKIE}={index}; Path=/; HttpOnly; SameSite=Lax\r\n"
+                    response = response[:status_end + 2] + cookie.encode() + response[status_end + 2:]
+                client_writer.write(response)
+            await _pipe(upstream_reader, client_writer)
+        
+        active[index] += 1
+        try:
+            upstream_writer.write(head)
+            await asyncio.gather(
+                _pipe(client_reader, upstream_writer),
+                respond()
+            )
+        finally:
+            active[index] -= 1
+    
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def run_balancer(host: str, port: int, worker_ports):
+    """Child process: forward public TCP connections to the workers"""
+    print(f"Load balancer on {host}:{port} -> workers on ports {worker_ports}")
+    try:
+        asyncio.run(_balance(host, port, worker_ports))
+    except KeyboardInterrupt:
+        pass
+    sys.exit(0)
+
+
+def _fork(target, *args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 1
+        try:
+            target(*args)
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else int(e.code is not None)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+    return pid
+
+
+def supervise(app: str, workers: int, host: str, port: int, base_port: int, streamlit_args):
+    """Fork the workers and the balancer, and re-fork any that exit"""
+    worker_ports = [base_port + i for i in range(workers)]
+    children = {}
+    stopping = False
+    
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    
+    for worker_port in worker_ports:
+        children[_fork(run_worker, app, worker_port, streamlit_args)] = ('worker', worker_port)
+    children[_fork(run_balancer, host, port, worker_ports)] = ('balancer', port)
+    
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        
+        role, child_port = children.pop(pid, (None, None))
+        if stopping or role is None:
+            continue
+        
+        # Re-fork from the preloaded parent so the replacement shares its pages too
+        print(f"{role} on port {child_port} exited with status {status}; restarting")
+        time.sleep(1)
+        if role == 'worker':
+            children[_fork(run_worker, app, child_port, streamlit_args)] = (role, child_port)
+        else:
+            children[_fork(run_balancer, host, child_port, worker_ports)] = (role, child_port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preload the models, then fork Streamlit workers")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Streamlit worker processes")
+    parser.add_argument('--host', default='0.0.0.0', help="Public address of the load balancer")
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', '8501')), help="Public port")
+    parser.add_argument('--base-port', type=int, default=8600, help="First local port used by the workers")
+    parser.add_argument('--app', default='app.py', help="Streamlit script to run")
+    parser.add_argument('--no-model', action='store_true', help="Preload catalogs and indexes only")
+    parser.add_argument('streamlit_args', nargs=argparse.REMAINDER,
+                        help="Extra arguments for 'streamlit run' (after --)")
+    args = parser.parse_args()
+    
+    streamlit_args = args.streamlit_args[1:] if args.streamlit_args[:1] == ['--'] else args.streamlit_args
+    
+    if not hasattr(os, 'fork'):
+        parser.error("launcher.py needs os.fork (Linux/macOS)")
+    
+    start = time.perf_counter()
+    try:
+        preload_shared_state(load_model=not args.no_model)
+    except RuntimeError as e:
+        parser.exit(1, f"{e}\n")
+    # Import Streamlit before forking so its modules are shared as well
+    import streamlit.web.cli  # noqa: F401
+    print(f"Preloaded catalogs, indexes and model in {time.perf_counter() - start:.1f}s")
+    
+    supervise(args.app, args.workers, args.host, args.port, args.base_port, streamlit_args)
+
+
+if __name__ == "__main__":
+    main()
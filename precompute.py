@@ -0,0 +1,43 @@
+"""
+Offline build step for the Skill Recognition Engine
+
+Encodes every ontology skill once and writes the derived indexes used at
+runtime, so the app can run with MODEL_FREE=1 (no torch / sentence-transformers).
+Also ranks the bridge courses for every common (role, gap set) combination.
+
+Usage:
+    python precompute.py
+"""
+
+import argparse
+import os
+
+# Disable TensorFlow to avoid compatibility issues
+os.environ.setdefault('USE_TF', 'NO')
+os.environ.setdefault('TRANSFORMERS_NO_TF', '1')
+
+# The build step itself needs the model, even on hosts that serve with MODEL_FREE=1
+os.environ['MODEL_FREE'] = '0'
+
+import utils
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute skill and role embedding indexes and bridge plans")
+    parser.add_argument('--ontology', default="data/skill_ontology.json", help="Skill ontology JSON")
+    parser.add_argument('--roles', default="data/ai_role_clusters.json", help="AI role clusters JSON")
+    parser.add_argument('--microcreds', default="data/microcredentials.json", help="Micro-credential catalog JSON")
+    args = parser.parse_args()
+    
+    table_path = utils.build_skill_embedding_table(args.ontology)
+    print(f"Skill embedding table written to {table_path}")
+    
+    role_index = utils.get_role_index(args.roles, args.ontology)
+    print(f"Role index ready: {len(role_index['role_ids'])} roles (key {role_index['key']})")
+    
+    plan_path = utils.build_bridge_plan_table(args.roles, args.microcreds)
+    print(f"Bridge plan table written to {plan_path}")
+
+
+if __name__ == "__main__":
+    main()
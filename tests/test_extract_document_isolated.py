@@ -0,0 +1,52 @@
+"""
+Checks for isolated document extraction
+
+The extraction worker must not re-execute the caller's __main__ (under
+Streamlit that is the whole app, model warm-up included).
+
+Run with: python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import types
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+
+
+class ExtractDocumentIsolatedTest(unittest.TestCase):
+    
+    def test_text_document(self):
+        text = utils.extract_document_isolated(b"Python developer, contact me@example.com", "txt")
+        self.assertEqual(text, "Python developer, contact [EMAIL]")
+    
+    def test_main_module_is_not_reexecuted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            marker = os.path.join(tmp, "executed")
+            app_path = os.path.join(tmp, "fakeapp.py")
+            with open(app_path, "w", encoding="utf-8") as f:
+                f.write(f"open({marker!r}, 'w').close()\n")
+            
+            fake_main = types.ModuleType("__main__")
+            fake_main.__file__ = app_path
+            real_main = sys.modules["__main__"]
+            sys.modules["__main__"] = fake_main
+            try:
+                text = utils.extract_document_isolated(b"SQL and statistics", "txt")
+            finally:
+                sys.modules["__main__"] = real_main
+            
+            self.assertEqual(text, "SQL and statistics")
+            self.assertFalse(os.path.exists(marker), "extraction worker re-executed __main__")
+    
+    def test_worker_timeout(self):
+        with self.assertRaises(utils.ExtractionError):
+            utils.extract_document_isolated(b"text", "txt", timeout=0.001)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Regression checks for keyword skill extraction
+
+extract_skills must keep finding what the original substring matcher found
+for whole words and their common inflections, but not keywords embedded in
+longer words - the false positives the keyword automaton was introduced to
+remove.
+
+Run with: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+
+ONTOLOGY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             "data", "skill_ontology.json")
+
+
+def baseline_extract_skills(text):
+    """The original substring matcher, kept as the reference behaviour"""
+    ontology = utils.load_skill_ontology(ONTOLOGY_PATH)
+    text_lower = text.lower()
+    found = {'hard_skills': [], 'soft_skills': []}
+    for kind in ('hard_skills', 'soft_skills'):
+        for skill in ontology[kind]:
+            if any(keyword.lower() in text_lower for keyword in skill['keywords']):
+                found[kind].append(skill['id'])
+    return found
+
+
+class ExtractSkillsRegressionTest(unittest.TestCase):
+
+    def assertMatchesBaseline(self, text):
+        self.assertEqual(utils.extract_skills(text, ONTOLOGY_PATH), baseline_extract_skills(text))
+
+    def test_inflected_forms_match_baseline(self):
+        phrases = [
+            "Managed a team of five, mentored new hires and supervised interns.",
+            "Gave presentations to stakeholders every quarter.",
+            "Built dashboards, analysed datasets and automated reports in Python.",
+            "Wrote SQL queries against PostgreSQL databases.",
+        ]
+        for text in phrases:
+            with self.subTest(text=text):
+                self.assertMatchesBaseline(text)
+
+    def test_leadership_and_communication_found(self):
+        skills = utils.extract_skills(
+            "Managed a team… mentored… supervised. Gave presentations.", ONTOLOGY_PATH
+        )
+        self.assertIn('leadership', skills['soft_skills'])
+        self.assertIn('communication', skills['soft_skills'])
+
+    def test_mid_word_short_keywords_do_not_match(self):
+        skills = utils.extract_skills("I wrote HTML pages and was happy in the semester.", ONTOLOGY_PATH)
+        found = skills['hard_skills'] + skills['soft_skills']
+        self.assertNotIn('machine_learning', found)
+        self.assertNotIn('python', found)
+    
+    def test_longer_keywords_do_not_match_inside_words(self):
+        cases = {
+            "Excellent written communication": 'excel',
+            "Reactive and proactive team member": 'javascript',
+            "cloudy projects": 'cloud_computing',
+        }
+        for text, skill in cases.items():
+            with self.subTest(text=text):
+                self.assertNotIn(skill, utils.extract_skills(text, ONTOLOGY_PATH)['hard_skills'])
+    
+    def test_whole_words_still_match(self):
+        skills = utils.extract_skills("Used Excel and React on AWS cloud", ONTOLOGY_PATH)
+        for skill in ('excel', 'javascript', 'cloud_computing'):
+            self.assertIn(skill, skills['hard_skills'])
+
+
+if __name__ == '__main__':
+    unittest.main()
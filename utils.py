@@ -5,6 +5,13 @@ Backend utility functions for the Skill Recognition Engine
 import re
 import json
 import os
+import hashlib
+import subprocess
+import sys
+import threading
+import time
+import copy
+from collections import OrderedDict
 from typing import List, Dict, Tuple
 from io import BytesIO
 
@@ -50,251 +57,2130 @@ def _import_docx():
         _Document = Document
     return _Document
 
+# Sentence transformer used for all skill embeddings
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_DIM = 384
+
+# Directory for derived artefacts (role index, embedding tables, ...)
+CACHE_DIR = os.environ.get('SKILL_ENGINE_CACHE_DIR', 'cache')
+
+# ONNX export of the model (see export_onnx.py), used by the onnx backends
+ONNX_MODEL_DIR = os.environ.get('ONNX_MODEL_DIR', os.path.join('models', f"{EMBEDDING_MODEL_NAME}-onnx"))
+EMBEDDING_BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+# Unix socket of a shared embedding service; empty means load the model in-process
+EMBEDDING_SOCKET = os.environ.get('EMBEDDING_SOCKET', '')
+EMBEDDING_SOCKET_TIMEOUT = float(os.environ.get('EMBEDDING_SOCKET_TIMEOUT', '60'))
+
+
+def get_embedding_backend() -> str:
+    """Selected embedding backend: 'torch' (default), 'onnx' or 'onnx-int8'"""
+    backend = os.environ.get('EMBEDDING_BACKEND', 'torch').lower()
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"EMBEDDING_BACKEND must be one of {EMBEDDING_BACKENDS}, got {backend!r}")
+    return backend
+
+
+def embedding_model_id() -> str:
+    """Model plus backend, used to version anything derived from embeddings"""
+    backend = get_embedding_backend()
+    return EMBEDDING_MODEL_NAME if backend == 'torch' else f"{EMBEDDING_MODEL_NAME}@{backend}"
+
+
+class OnnxSentenceEncoder:
+    """
+    Sentence embedding model run with onnxruntime instead of PyTorch
+    
+    Reproduces the all-MiniLM-L6-v2 pipeline (tokenize, transformer, mean
+    pooling, L2 normalisation) and exposes the same encode() interface as
+    SentenceTransformer. Importing it never loads torch.
+    """
+    
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, quantized: bool = False, max_seq_length: int = 256):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The onnx embedding backends need onnxruntime and tokenizers: "
+                "pip install onnxruntime tokenizers"
+            ) from e
+        
+        model_path = os.path.join(model_dir, 'model.int8.onnx' if quantized else 'model.onnx')
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"{model_path} not found. Run 'python export_onnx.py' first.")
+        
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token='[PAD]')
+        
+        options = ort.SessionOptions()
+        threads = int(os.environ.get('OMP_NUM_THREADS', '0'))
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self._input_names = {node.name for node in self.session.get_inputs()}
+    
+    def encode(self, sentences, batch_size: int = 32, **kwargs):
+        """Encode a string or list of strings into L2-normalised embeddings"""
+        np = _import_numpy()
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+        
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            encodings = self.tokenizer.encode_batch(list(sentences[start:start + batch_size]))
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feed = {
+                'input_ids': input_ids,
+                'attention_mask': attention_mask,
+                'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64)
+            }
+            hidden = self.session.run(None, {k: v for k, v in feed.items() if k in self._input_names})[0]
+            
+            # Mean pooling over real tokens, then L2 normalisation
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled.astype(np.float32))
+        
+        embeddings = np.concatenate(batches) if batches else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
+# ============================================================================
+# EMBEDDING MODEL LIFECYCLE
+# ============================================================================
+
+# The model is loaded at most once per process, even when several sessions ask
+# for it at the same moment. Status and metrics are exposed for the UI, and an
+# optional reaper unloads the model after a period of inactivity.
+MODEL_IDLE_UNLOAD_SECONDS = float(os.environ.get('MODEL_IDLE_UNLOAD_SECONDS', '0'))
+MODEL_UNLOAD_RSS_MB = float(os.environ.get('MODEL_UNLOAD_RSS_MB', '0'))
+
 # Load sentence transformer model (cached after first load)
 _model = None
+_model_lock = threading.Lock()
+_model_stats_lock = threading.Lock()
+_model_state = {'status': 'unloaded', 'error': None, 'last_used': 0.0}
+_model_metrics = {
+    'load_count': 0,
+    'load_seconds': 0.0,
+    'last_load_seconds': None,
+    'unload_count': 0,
+    'encode_requests': 0,
+    'batched_requests': 0,
+    'encode_calls': 0,
+    'encoded_texts': 0,
+    'encode_seconds': 0.0
+}
+_warmup_started = False
+_reaper_started = False
+
+
+def _load_embedding_model():
+    """Instantiate the configured embedding backend"""
+    if is_model_free():
+        raise RuntimeError("Embedding model requested while MODEL_FREE=1")
+    
+    if EMBEDDING_SOCKET:
+        # A shared sidecar process owns the model (see embedding_service.py)
+        from embedding_service import SocketEncoder
+        return SocketEncoder(EMBEDDING_SOCKET, model_id=embedding_model_id(), timeout=EMBEDDING_SOCKET_TIMEOUT)
+    
+    backend = get_embedding_backend()
+    if backend != 'torch':
+        # ONNX Runtime backends never import torch
+        return OnnxSentenceEncoder(ONNX_MODEL_DIR, quantized=(backend == 'onnx-int8'))
+    
+    SentenceTransformer = _import_sentence_transformers()
+    
+    # Use smaller model for low-memory environments
+    if os.environ.get('RENDER') or os.environ.get('LOW_MEMORY') == '1':
+        # Use a lighter model that fits in 512MB
+        return SentenceTransformer(EMBEDDING_MODEL_NAME, device='cpu')
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
 
 def get_embedding_model():
     """Lazy load the sentence transformer model with memory optimization"""
     global _model
-    if _model is None:
-        import os
-        SentenceTransformer = _import_sentence_transformers()
-        
-        # Use smaller model for low-memory environments
-        if os.environ.get('RENDER') or os.environ.get('LOW_MEMORY') == '1':
-            # Use a lighter model that fits in 512MB
-            _model = SentenceTransformer('all-MiniLM-L6-v2', device='cpu')
+    model = _model
+    if model is None:
+        with _model_lock:
+            # Another session may have finished loading while we waited
+            if _model is None:
+                _model_state.update(status='loading', error=None)
+                start = time.perf_counter()
+                try:
+                    _model = _load_embedding_model()
+                except Exception as e:
+                    _model_state.update(status='failed', error=str(e))
+                    raise
+                elapsed = time.perf_counter() - start
+                with _model_stats_lock:
+                    _model_metrics['load_count'] += 1
+                    _model_metrics['load_seconds'] += elapsed
+                    _model_metrics['last_load_seconds'] = elapsed
+                _model_state['status'] = 'ready'
+            model = _model
+    
+    _model_state['last_used'] = time.time()
+    return model
+
+
+def _encode_direct(texts: List[str]):
+    """Run one forward pass of the model over texts, recording its latency"""
+    np = _import_numpy()
+    model = get_embedding_model()
+    start = time.perf_counter()
+    embeddings = np.asarray(model.encode(texts), dtype=np.float32)
+    elapsed = time.perf_counter() - start
+    
+    with _model_stats_lock:
+        _model_metrics['encode_calls'] += 1
+        _model_metrics['encoded_texts'] += len(texts)
+        _model_metrics['encode_seconds'] += elapsed
+    _model_state['last_used'] = time.time()
+    return embeddings
+
+
+class EncodeBatcher:
+    """
+    Merge concurrent encode requests into a single forward pass
+    
+    Requests from all sessions are collected for up to window_ms (or until
+    max_batch texts are pending), encoded together with duplicates removed,
+    and each caller gets back the rows for its own texts.
+    """
+    
+    def __init__(self, encode_fn, window_ms: float = 5.0, max_batch: int = 64):
+        self._encode_fn = encode_fn
+        self._window = window_ms / 1000.0
+        self._max_batch = max_batch
+        self._lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+    
+    def _ensure_worker(self):
+        # Threads do not survive fork, so each process starts its own worker
+        with self._lock:
+            if self._pid != os.getpid():
+                import queue
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name="encode-batcher", daemon=True).start()
+    
+    def encode(self, texts: List[str]):
+        """Encode texts as part of the next batch; blocks until the result is ready"""
+        self._ensure_worker()
+        request = {'texts': list(texts), 'done': threading.Event(), 'result': None, 'error': None}
+        self._queue.put(request)
+        request['done'].wait()
+        if request['error'] is not None:
+            raise request['error']
+        return request['result']
+    
+    def _run(self):
+        import queue
+        pending = self._queue
+        
+        while True:
+            batch = [pending.get()]
+            size = len(batch[0]['texts'])
+            deadline = time.monotonic() + self._window
+            
+            while size < self._max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request['texts'])
+            
+            rows = {}
+            for request in batch:
+                for text in request['texts']:
+                    rows.setdefault(text, len(rows))
+            
+            try:
+                embeddings = self._encode_fn(list(rows))
+                for request in batch:
+                    request['result'] = embeddings[[rows[text] for text in request['texts']]]
+            except Exception as e:
+                for request in batch:
+                    request['error'] = e
+            finally:
+                with _model_stats_lock:
+                    _model_metrics['batched_requests'] += len(batch)
+                for request in batch:
+                    request['done'].set()
+
+
+# Cross-session micro-batching of encode calls (ENCODE_BATCH_WINDOW_MS=0 disables)
+ENCODE_BATCH_WINDOW_MS = float(os.environ.get('ENCODE_BATCH_WINDOW_MS', '5'))
+ENCODE_MAX_BATCH = int(os.environ.get('ENCODE_MAX_BATCH', '64'))
+_encode_batcher = EncodeBatcher(_encode_direct, ENCODE_BATCH_WINDOW_MS, ENCODE_MAX_BATCH)
+
+
+# ============================================================================
+# TEXT EMBEDDING CACHE
+# ============================================================================
+
+# Embeddings are cached per (model id, normalized text): an in-process LRU in
+# front of an append-only, memory-mapped store under CACHE_DIR that survives
+# restarts and is shared by every process on the host.
+EMBEDDING_CACHE_SIZE = int(os.environ.get('EMBEDDING_CACHE_SIZE', '4096'))
+EMBEDDING_CACHE_DISK = os.environ.get('EMBEDDING_CACHE_DISK', '1') == '1'
+EMBEDDING_CACHE_DISK_MAX_ROWS = int(os.environ.get('EMBEDDING_CACHE_DISK_MAX_ROWS', '200000'))
+
+
+def _normalize_embedding_text(text: str) -> str:
+    import unicodedata
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of text embeddings for one model id
+    
+    The disk tier is a pair of files: vectors.f32 holds float32 rows and
+    keys.txt holds one text digest per row. Rows are appended under an
+    exclusive flock, vectors before keys, so a key never points at a
+    half-written row. Other processes' appends are picked up on the next miss.
+    """
+    
+    def __init__(self, model_id: str, directory: str = None, memory_size: int = EMBEDDING_CACHE_SIZE,
+                 disk_max_rows: int = EMBEDDING_CACHE_DISK_MAX_ROWS):
+        self.model_id = model_id
+        self.memory_size = memory_size
+        self.disk_max_rows = disk_max_rows
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'disk_rows': 0, 'disk_full': 0}
+        
+        self._dir = None
+        if directory:
+            safe_id = re.sub(r'[^A-Za-z0-9_.@-]', '_', model_id)
+            self._dir = os.path.join(directory, 'text_embeddings', safe_id)
+        self._rows = {}
+        self._keys_offset = 0
+        self._vectors = None
+    
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha1(_normalize_embedding_text(text).encode('utf-8')).hexdigest()
+    
+    def _paths(self):
+        return os.path.join(self._dir, 'keys.txt'), os.path.join(self._dir, 'vectors.f32')
+    
+    def _refresh_disk(self):
+        """Index rows appended since the last refresh (by us or another process)"""
+        np = _import_numpy()
+        keys_path, vectors_path = self._paths()
+        try:
+            with open(keys_path, 'rb') as f:
+                f.seek(self._keys_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        
+        # Ignore a trailing partial line; it is re-read once complete
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return
+        for line in data[:end].splitlines():
+            self._rows.setdefault(line.decode('ascii'), len(self._rows))
+        self._keys_offset += end
+        
+        rows = len(self._rows)
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode='r', shape=(rows, EMBEDDING_DIM))
+        self._stats['disk_rows'] = rows
+    
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self._stats['evictions'] += 1
+    
+    def get_many(self, texts: List[str]) -> List:
+        """Cached vector for each text, or None where it has not been embedded yet"""
+        keys = [self.key(text) for text in texts]
+        results = [None] * len(texts)
+        
+        with self._lock:
+            refreshed = False
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self._stats['hits'] += 1
+                    results[i] = vector
+                    continue
+                
+                if self._dir is not None:
+                    if key not in self._rows and not refreshed:
+                        self._refresh_disk()
+                        refreshed = True
+                    if key in self._rows:
+                        vector = self._vectors[self._rows[key]].copy()
+                        self._remember(key, vector)
+                        self._stats['disk_hits'] += 1
+                        results[i] = vector
+                        continue
+                
+                self._stats['misses'] += 1
+        return results
+    
+    def put_many(self, texts: List[str], vectors) -> None:
+        """Store freshly encoded vectors in both tiers"""
+        np = _import_numpy()
+        vectors = np.asarray(vectors, dtype=np.float32)
+        keys = [self.key(text) for text in texts]
+        
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector.copy())
+            if self._dir is not None:
+                try:
+                    self._append_disk(keys, vectors)
+                except OSError as e:
+                    print(f"Could not persist text embeddings: {e}")
+    
+    def _append_disk(self, keys, vectors):
+        os.makedirs(self._dir, exist_ok=True)
+        keys_path, vectors_path = self._paths()
+        
+        with open(keys_path, 'ab') as keys_file:
+            try:
+                import fcntl
+                fcntl.flock(keys_file, fcntl.LOCK_EX)
+            except ImportError:
+                pass
+            
+            # Another process may have appended the same texts meanwhile
+            self._refresh_disk()
+            new = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self._rows and key not in new:
+                    new[key] = vector
+            if not new:
+                return
+            if len(self._rows) + len(new) > self.disk_max_rows:
+                self._stats['disk_full'] += 1
+                return
+            
+            with open(vectors_path, 'r+b' if os.path.exists(vectors_path) else 'wb') as vectors_file:
+                # Drop any partial row left by a writer that died mid-append
+                vectors_file.truncate(len(self._rows) * EMBEDDING_DIM * 4)
+                vectors_file.seek(0, os.SEEK_END)
+                vectors_file.write(b''.join(vector.tobytes() for vector in new.values()))
+                vectors_file.flush()
+                os.fsync(vectors_file.fileno())
+            keys_file.write(''.join(f"{key}\n" for key in new).encode('ascii'))
+            keys_file.flush()
+        
+        self._refresh_disk()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['disk_hits']) / lookups if lookups else None
+        stats['memory_entries'] = len(self._memory)
+        return stats
+
+
+_embedding_caches = {}
+_embedding_caches_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Text embedding cache of the configured model"""
+    model_id = embedding_model_id()
+    with _embedding_caches_lock:
+        cache = _embedding_caches.get(model_id)
+        if cache is None:
+            directory = CACHE_DIR if EMBEDDING_CACHE_DISK else None
+            cache = _embedding_caches[model_id] = EmbeddingCache(model_id, directory)
+        return cache
+
+
+def encode_texts(texts: List[str]):
+    """
+    Encode texts with the embedding model
+    
+    Texts already in the embedding cache are not re-encoded. The rest are
+    micro-batched with concurrent calls into one forward pass unless
+    ENCODE_BATCH_WINDOW_MS is 0.
+    
+    Returns:
+        float32 array of shape (len(texts), EMBEDDING_DIM)
+    """
+    np = _import_numpy()
+    texts = list(texts)
+    if not texts:
+        return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+    
+    with _model_stats_lock:
+        _model_metrics['encode_requests'] += 1
+    
+    cache = get_embedding_cache()
+    cached = cache.get_many(texts)
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+    
+    if missing:
+        if ENCODE_BATCH_WINDOW_MS > 0:
+            encoded = _encode_batcher.encode(missing)
         else:
-            _model = SentenceTransformer('all-MiniLM-L6-v2')
-    return _model
+            encoded = _encode_direct(missing)
+        cache.put_many(missing, encoded)
+        fresh = dict(zip(missing, encoded))
+        cached = [fresh[text] if vector is None else vector for text, vector in zip(texts, cached)]
+    
+    return np.stack(cached).astype(np.float32, copy=False)
+
+
+def unload_embedding_model() -> bool:
+    """Drop the loaded model so its memory can be reclaimed; True if one was loaded"""
+    global _model
+    with _model_lock:
+        if _model is None:
+            return False
+        _model = None
+        _model_state['status'] = 'unloaded'
+        with _model_stats_lock:
+            _model_metrics['unload_count'] += 1
+    
+    import gc
+    gc.collect()
+    return True
+
+
+def _current_rss_mb() -> float:
+    """Resident set size of this process in MB (0 when unknown)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0.0
+
+
+def _idle_model_reaper():
+    interval = max(5.0, min(60.0, MODEL_IDLE_UNLOAD_SECONDS / 4))
+    while True:
+        time.sleep(interval)
+        if _model is None or time.time() - _model_state['last_used'] < MODEL_IDLE_UNLOAD_SECONDS:
+            continue
+        if MODEL_UNLOAD_RSS_MB and _current_rss_mb() < MODEL_UNLOAD_RSS_MB:
+            continue
+        if unload_embedding_model():
+            print(f"Unloaded idle embedding model (idle > {MODEL_IDLE_UNLOAD_SECONDS:.0f}s)")
+
+
+def start_model_warmup():
+    """
+    Load the catalogs, indexes and embedding model in a background thread
+    
+    Safe to call on every server start or rerun; only the first call does
+    anything. Also starts the idle-unload reaper when MODEL_IDLE_UNLOAD_SECONDS
+    is set.
+    """
+    global _warmup_started, _reaper_started
+    
+    with _model_lock:
+        if _warmup_started:
+            return
+        _warmup_started = True
+    
+    def warm_up():
+        try:
+            get_role_index()
+            get_bridge_plans()
+            if not is_model_free():
+                get_embedding_model()
+        except Exception as e:
+            print(f"Model warm-up failed: {e}")
+    
+    threading.Thread(target=warm_up, name="model-warmup", daemon=True).start()
+    
+    if MODEL_IDLE_UNLOAD_SECONDS > 0 and not is_model_free() and not _reaper_started:
+        _reaper_started = True
+        threading.Thread(target=_idle_model_reaper, name="model-reaper", daemon=True).start()
+
+
+def get_model_status() -> Dict:
+    """
+    Readiness and metrics of the embedding model
+    
+    Returns:
+        Dictionary with 'status' ('disabled', 'unloaded', 'loading', 'ready'
+        or 'failed'), 'error', load/encode metrics, 'rss_mb' and the
+        'embedding_cache' hit/miss/eviction counts
+    """
+    with _model_stats_lock:
+        metrics = dict(_model_metrics)
+    
+    status = 'disabled' if is_model_free() else _model_state['status']
+    calls = metrics['encode_calls']
+    metrics['mean_encode_ms'] = 1000 * metrics['encode_seconds'] / calls if calls else None
+    
+    return {
+        'status': status,
+        'error': _model_state['error'],
+        'backend': get_embedding_backend(),
+        'idle_seconds': time.time() - _model_state['last_used'] if _model_state['last_used'] else None,
+        'rss_mb': _current_rss_mb(),
+        'embedding_cache': get_embedding_cache().stats(),
+        **metrics
+    }
+
+
+# Budgets for a single document extraction
+DOCUMENT_MAX_BYTES = int(os.environ.get('DOCUMENT_MAX_BYTES', str(25 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.environ.get('PDF_MAX_PAGES', '50'))
+EXTRACTION_TIME_LIMIT = float(os.environ.get('EXTRACTION_TIME_LIMIT', '20'))
+
 
+def _as_stream(cv_file):
+    """Use a seekable upload as-is; only copy into BytesIO when we have to"""
+    if hasattr(cv_file, 'read') and hasattr(cv_file, 'seek'):
+        try:
+            cv_file.seek(0)
+            return cv_file
+        except Exception:
+            pass
+    data = cv_file.read() if hasattr(cv_file, 'read') else cv_file
+    return BytesIO(data)
 
-def ingest_and_clean(cv_file, file_type: str = "pdf") -> str:
+
+def _stream_size(stream) -> int:
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+
+def iter_pdf_pages(stream, max_pages: int = None, time_limit: float = None):
+    """
+    Yield the text of a PDF page by page, stopping at the page or time budget
+    
+    Args:
+        stream: Seekable binary file-like object
+        max_pages: Maximum number of pages to read
+        time_limit: Wall-clock seconds allowed for the whole document
+    """
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    time_limit = EXTRACTION_TIME_LIMIT if time_limit is None else time_limit
+    deadline = time.monotonic() + time_limit
+    
+    PyPDF2 = _import_pdf()
+    pdf_reader = PyPDF2.PdfReader(stream)
+    
+    for page_number, page in enumerate(pdf_reader.pages):
+        if page_number >= max_pages:
+            print(f"PDF truncated at the {max_pages}-page limit")
+            break
+        if time.monotonic() > deadline:
+            print(f"PDF truncated after {page_number} pages: {time_limit}s time limit reached")
+            break
+        yield page.extract_text() or ""
+
+
+def _extract_text(stream, file_type: str, max_pages: int = None,
+                  max_bytes: int = None, time_limit: float = None) -> str:
+    """Extract and clean the text of a document, raising on any failure"""
+    max_bytes = DOCUMENT_MAX_BYTES if max_bytes is None else max_bytes
+    size = _stream_size(stream)
+    if size > max_bytes:
+        raise ValueError(f"document is {size} bytes, limit is {max_bytes}")
+    
+    text = ""
+    if file_type == "pdf":
+        # Read PDF one page at a time and join once
+        text = "\n".join(iter_pdf_pages(stream, max_pages, time_limit))
+    
+    elif file_type == "docx":
+        # Read DOCX
+        Document = _import_docx()
+        doc = Document(stream)
+        text = "\n".join([para.text for para in doc.paragraphs])
+    
+    elif file_type == "txt":
+        text = stream.read().decode('utf-8', errors='replace')
+    
+    # Clean text
+    return clean_text(text)
+
+
+def ingest_and_clean(cv_file, file_type: str = "pdf",
+                     max_pages: int = None,
+                     max_bytes: int = None,
+                     time_limit: float = None) -> str:
     """
     Extract text from PDF/DOCX file and clean it
     
     Args:
-        cv_file: File object from Streamlit uploader
-        file_type: 'pdf' or 'docx'
+        cv_file: File object from Streamlit uploader
+        file_type: 'pdf', 'docx' or 'txt'
+        max_pages: PDF page budget (default PDF_MAX_PAGES)
+        max_bytes: Size budget (default DOCUMENT_MAX_BYTES)
+        time_limit: PDF wall-clock budget in seconds (default EXTRACTION_TIME_LIMIT)
+    
+    Returns:
+        Cleaned text string
+    """
+    try:
+        text = _extract_text(_as_stream(cv_file), file_type, max_pages, max_bytes, time_limit)
+    except Exception as e:
+        print(f"Error extracting text: {e}")
+        text = ""
+    
+    return text
+
+
+# ============================================================================
+# ISOLATED DOCUMENT EXTRACTION
+# ============================================================================
+
+# Parsing untrusted documents runs in short-lived worker processes so that a
+# pathological file cannot block the Streamlit script thread or hold the GIL.
+# Each job gets its own process (at most EXTRACTION_WORKERS at a time), which
+# means a timeout or crash only ever kills the job that caused it. Workers are
+# fresh interpreters running extraction_worker.py rather than multiprocessing
+# children, which would re-execute the Streamlit app as __mp_main__.
+EXTRACTION_WORKERS = int(os.environ.get('EXTRACTION_WORKERS', '2'))
+EXTRACTION_MEMORY_LIMIT_MB = int(os.environ.get('EXTRACTION_MEMORY_LIMIT_MB', '256'))
+EXTRACTION_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extraction_worker.py')
+
+_extraction_slots = threading.BoundedSemaphore(max(1, EXTRACTION_WORKERS))
+
+
+class ExtractionError(Exception):
+    """Raised when a document could not be extracted by a worker process"""
+
+
+def extract_document_isolated(cv_file, file_type: str = "pdf",
+                              timeout: float = None,
+                              max_pages: int = None,
+                              max_bytes: int = None,
+                              time_limit: float = None) -> str:
+    """
+    Extract and clean a document's text in a separate worker process
+    
+    Args:
+        cv_file: File object from Streamlit uploader
+        file_type: 'pdf', 'docx' or 'txt'
+        timeout: Hard limit in seconds before the worker is killed
+            (default: EXTRACTION_TIME_LIMIT plus a 5 second grace period)
+    
+    Returns:
+        Cleaned text string
+    
+    Raises:
+        ExtractionError: The document is too large, the worker timed out,
+            crashed, hit its memory limit or failed to parse the file
+    """
+    max_bytes = DOCUMENT_MAX_BYTES if max_bytes is None else max_bytes
+    time_limit = EXTRACTION_TIME_LIMIT if time_limit is None else time_limit
+    timeout = time_limit + 5 if timeout is None else timeout
+    
+    stream = _as_stream(cv_file)
+    size = _stream_size(stream)
+    if size > max_bytes:
+        raise ExtractionError(f"File is too large ({size / 1024 / 1024:.1f} MB, limit {max_bytes / 1024 / 1024:.0f} MB)")
+    data = stream.read()
+    
+    if not _extraction_slots.acquire(timeout=timeout):
+        raise ExtractionError("All extraction workers are busy, please try again")
+    try:
+        command = [sys.executable, EXTRACTION_WORKER_SCRIPT, file_type,
+                   '--time-limit', str(time_limit),
+                   '--memory-limit-mb', str(EXTRACTION_MEMORY_LIMIT_MB)]
+        if max_pages is not None:
+            command += ['--max-pages', str(max_pages)]
+        
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        try:
+            output, _ = process.communicate(data, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise ExtractionError(f"Extraction timed out after {timeout:.0f} seconds")
+    finally:
+        _extraction_slots.release()
+    
+    try:
+        result = json.loads(output)
+    except ValueError:
+        raise ExtractionError(f"Extraction worker crashed (exit code {process.returncode})")
+    
+    if result['status'] != 'ok':
+        raise ExtractionError(f"Could not read document: {result['error']}")
+    return result['text']
+
+
+def clean_text(text: str) -> str:
+    """
+    Clean and normalize text
+    Remove PII (email, phone, address patterns)
+    """
+    # Remove emails
+    text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL]', text)
+    
+    # Remove phone numbers (various formats)
+    text = re.sub(r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', '[PHONE]', text)
+    
+    # Remove extra whitespace
+    text = re.sub(r'\s+', ' ', text)
+    
+    # Normalize bullets
+    text = re.sub(r'[•●○■◆◇▪▫]', '-', text)
+    
+    return text.strip()
+
+
+# ============================================================================
+# CATALOG REGISTRY
+# ============================================================================
+
+# Each data file is parsed once per process and its derived lookups are built
+# once per version. An entry is replaced as a whole when the file's mtime/size
+# changes and its content hash differs, so readers never see a half-reloaded
+# catalog. Returned data is shared between callers and must not be mutated.
+_catalogs = {}
+_catalog_lock = threading.Lock()
+
+
+def _load_catalog(filepath: str) -> Dict:
+    """Return the registry entry for a JSON data file, reparsing only on change"""
+    stat = os.stat(filepath)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    
+    entry = _catalogs.get(filepath)
+    if entry is not None and entry['stamp'] == stamp:
+        return entry
+    
+    with _catalog_lock:
+        entry = _catalogs.get(filepath)
+        if entry is not None and entry['stamp'] == stamp:
+            return entry
+        
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()[:16]
+        
+        if entry is not None and entry['digest'] == digest:
+            # Touched but unchanged: keep the parsed data and derived lookups
+            entry = dict(entry, stamp=stamp)
+        else:
+            entry = {
+                'stamp': stamp,
+                'digest': digest,
+                'data': json.loads(raw.decode('utf-8')),
+                'derived': {}
+            }
+        _catalogs[filepath] = entry
+    
+    return entry
+
+
+def _catalog_lookup(filepath: str, name: str, builder):
+    """Return a lookup derived from a data file, building it once per version"""
+    entry = _load_catalog(filepath)
+    derived = entry['derived']
+    if name not in derived:
+        derived[name] = builder(entry['data'])
+    return derived[name]
+
+
+def catalog_version(*paths: str) -> str:
+    """Content digest of the current versions of one or more data files"""
+    return "-".join(_load_catalog(path)['digest'] for path in paths)
+
+
+def load_skill_ontology(filepath: str = "data/skill_ontology.json") -> Dict:
+    """Load skill ontology from JSON"""
+    return _load_catalog(filepath)['data']
+
+
+# ============================================================================
+# KEYWORD MATCHING
+# ============================================================================
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton that finds whole-word keyword hits in one pass
+    
+    Keywords are matched case-insensitively. A hit only counts when it does
+    not start in the middle of a word, so "ml" does not match inside "html"
+    and "py" does not match inside "happy". It must also end the word, or be
+    followed only by one of INFLECTION_SUFFIXES: "mentor" matches in
+    "mentored" and "presentation" in "presentations", but "excel" does not
+    match inside "excellent" nor "cloud" inside "cloudy". Short keywords
+    (SHORT_KEYWORD_LENGTH characters or fewer) take no suffixes, so "sem"
+    does not match inside "semester".
+    """
+    
+    SHORT_KEYWORD_LENGTH = 3
+    INFLECTION_SUFFIXES = ('s', 'es', 'ed', 'd', 'ing', 'er', 'ers')
+    
+    def __init__(self, keywords: Dict[str, List[str]]):
+        """
+        Args:
+            keywords: Mapping of keyword -> labels reported when it is found
+        """
+        from collections import deque
+        
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        
+        for keyword, labels in keywords.items():
+            keyword = keyword.lower()
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            if not keyword[-1].isalnum():
+                suffixes = None
+            elif len(keyword) <= self.SHORT_KEYWORD_LENGTH:
+                suffixes = ()
+            else:
+                suffixes = self.INFLECTION_SUFFIXES
+            self._out[state].append((len(keyword), keyword[0].isalnum(), suffixes, tuple(labels)))
+        
+        # Breadth-first pass to set failure links and inherit suffix outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+    
+    @staticmethod
+    def _ends_word(text: str, end: int, suffixes) -> bool:
+        """Whether text[end:] starts at a word boundary, after at most one allowed suffix"""
+        if end >= len(text) or not text[end].isalnum():
+            return True
+        for suffix in suffixes:
+            after = end + len(suffix)
+            if text.startswith(suffix, end) and (after >= len(text) or not text[after].isalnum()):
+                return True
+        return False
+    
+    def find(self, text: str) -> set:
+        """Return the set of labels whose keywords appear as (inflected) words in text"""
+        text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            
+            for length, word_start, suffixes, labels in out[state]:
+                start = i - length + 1
+                if word_start and start > 0 and text[start - 1].isalnum():
+                    continue
+                if suffixes is not None and not self._ends_word(text, i + 1, suffixes):
+                    continue
+                found.update(labels)
+        
+        return found
+
+
+def _build_skill_matcher(ontology: Dict) -> Dict:
+    """Compile the keyword automaton and ontology order for extract_skills"""
+    keywords = {}
+    order = {}
+    for kind in ('hard_skills', 'soft_skills'):
+        for skill in ontology[kind]:
+            order.setdefault(skill['id'], (kind, len(order)))
+            for keyword in skill['keywords']:
+                keywords.setdefault(keyword.lower(), []).append(skill['id'])
+    
+    return {'automaton': KeywordAutomaton(keywords), 'order': order}
+
+
+def extract_skills(text: str, ontology_path: str = "data/skill_ontology.json") -> Dict[str, List[str]]:
+    """
+    Extract skills from text using keyword matching and patterns
+    
+    Returns:
+        Dictionary with 'hard_skills' and 'soft_skills' lists
+    """
+    matcher = _catalog_lookup(ontology_path, 'skill_matcher', _build_skill_matcher)
+    order = matcher['order']
+    
+    skills = {'hard_skills': [], 'soft_skills': []}
+    
+    # Report skills in ontology order
+    for sid in sorted(matcher['automaton'].find(text), key=lambda sid: order[sid][1]):
+        skills[order[sid][0]].append(sid)
+    
+    return skills
+
+
+def get_skill_names(skill_ids: List[str], ontology_path: str = "data/skill_ontology.json") -> List[str]:
+    """Convert skill IDs to readable names"""
+    skill_map = _catalog_lookup(ontology_path, 'skill_names', _build_skill_name_map)
+    return [skill_map.get(sid, sid) for sid in skill_ids]
+
+
+def _build_skill_name_map(ontology: Dict) -> Dict[str, str]:
+    skill_map = {}
+    for skill in ontology['hard_skills']:
+        skill_map[skill['id']] = skill['name']
+    for skill in ontology['soft_skills']:
+        skill_map[skill['id']] = skill['name']
+    return skill_map
+
+
+# ============================================================================
+# SKILL EMBEDDING TABLE
+# ============================================================================
+
+# Every vector the matching pipeline needs is the embedding of a canonical skill
+# name from the ontology, so those are precomputed (see precompute.py). With
+# MODEL_FREE=1 the runtime only reads this table and never imports torch.
+_skill_table = None
+
+
+def is_model_free() -> bool:
+    """True when the runtime must not load the sentence transformer"""
+    return os.environ.get('MODEL_FREE') == '1'
+
+
+def _catalog_fingerprint(*paths: str, extra: str = "") -> str:
+    """Content hash of one or more data files plus an extra version string"""
+    digest = hashlib.sha256(catalog_version(*paths).encode('utf-8'))
+    digest.update(extra.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def _save_npz_atomic(path: str, **arrays):
+    """Write an .npz file via a temporary file so readers never see partial data"""
+    np = _import_numpy()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def _skill_table_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"skill_embeddings_{key}.npz")
+
+
+def build_skill_embedding_table(ontology_path: str = "data/skill_ontology.json") -> str:
+    """
+    Encode every ontology skill name and write the skill-id -> embedding table
+    
+    Returns:
+        Path of the written table
+    """
+    np = _import_numpy()
+    ontology = load_skill_ontology(ontology_path)
+    skills = ontology['hard_skills'] + ontology['soft_skills']
+    
+    ids = [skill['id'] for skill in skills]
+    names = [skill['name'] for skill in skills]
+    vectors = encode_texts(names)
+    
+    key = _catalog_fingerprint(ontology_path, extra=embedding_model_id())
+    path = _skill_table_path(key)
+    _save_npz_atomic(path, ids=np.array(ids), names=np.array(names), vectors=vectors)
+    return path
+
+
+def get_skill_embedding_table(ontology_path: str = "data/skill_ontology.json") -> Dict:
+    """
+    Load the precomputed skill embedding table for the current ontology
+    
+    The table is built on demand when the model is available. In model-free
+    mode a missing table is an error, since nothing could be embedded.
+    
+    Returns:
+        Dictionary with 'key', 'ids' (ontology order), 'vectors' and
+        'rows' (skill id or name -> row)
+    """
+    global _skill_table
+    np = _import_numpy()
+    
+    key = _catalog_fingerprint(ontology_path, extra=embedding_model_id())
+    if _skill_table is not None and _skill_table['key'] == key:
+        return _skill_table
+    
+    path = _skill_table_path(key)
+    if not os.path.exists(path):
+        if is_model_free():
+            raise RuntimeError(
+                f"No precomputed skill embeddings at {path}. "
+                "Run 'python precompute.py' or unset MODEL_FREE."
+            )
+        path = build_skill_embedding_table(ontology_path)
+    
+    with np.load(path, allow_pickle=False) as data:
+        ids = [str(sid) for sid in data['ids']]
+        names = [str(name) for name in data['names']]
+        vectors = data['vectors']
+    
+    rows = {}
+    for row, (sid, name) in enumerate(zip(ids, names)):
+        rows[sid] = row
+        rows.setdefault(name, row)
+    
+    _skill_table = {'key': key, 'ids': ids, 'vectors': vectors, 'rows': rows}
+    return _skill_table
+
+
+def embed_skills(skills: List[str], ontology_path: str = "data/skill_ontology.json"):
+    """
+    Embed a list of skill IDs or names
+    
+    Ontology skills are read from the precomputed table. Anything else is
+    encoded with the model, or skipped in model-free mode.
+    
+    Returns:
+        Array of shape (n, EMBEDDING_DIM), one row per embedded skill
+    """
+    table = get_skill_embedding_table(ontology_path)
+    rows = [table['rows'].get(skill) for skill in skills]
+    
+    if all(row is not None for row in rows):
+        return table['vectors'][rows]
+    
+    if is_model_free():
+        unknown = [skill for skill, row in zip(skills, rows) if row is None]
+        print(f"Skipping skills without precomputed embeddings: {unknown}")
+        return table['vectors'][[row for row in rows if row is not None]]
+    
+    return encode_texts(get_skill_names(skills, ontology_path))
+
+
+def compute_user_vector(skills: List[str]):
+    """
+    Compute user skill embedding using Sentence-BERT
+    
+    Args:
+        skills: List of skill IDs or names
+    
+    Returns:
+        Mean-pooled embedding vector
+    """
+    np = _import_numpy()
+    
+    if not skills:
+        return np.zeros(EMBEDDING_DIM)  # Default embedding size for MiniLM
+    
+    # Compute embeddings
+    embeddings = embed_skills(skills)
+    if len(embeddings) == 0:
+        return np.zeros(EMBEDDING_DIM)
+    
+    # Mean pooling
+    user_vector = np.mean(embeddings, axis=0)
+    
+    return user_vector
+
+
+def load_role_clusters(filepath: str = "data/ai_role_clusters.json") -> List[Dict]:
+    """Load AI role clusters"""
+    return _load_catalog(filepath)['data']
+
+
+def _build_role_skill_sets(roles: List[Dict]) -> List[set]:
+    return [set(role['required_skills'] + role['soft_skills']) for role in roles]
+
+
+# ============================================================================
+# ROLE VECTOR INDEX
+# ============================================================================
+
+# Role vectors only depend on the role catalog, the ontology and the model, so
+# they are computed once, stored on disk and reused until one of those changes.
+# Large catalogs can put an approximate nearest-neighbour index in front of
+# match_roles (ROLE_INDEX_BACKEND=ivf, see vector_index.py).
+ROLE_INDEX_BACKEND = os.environ.get('ROLE_INDEX_BACKEND', 'exact')
+ROLE_INDEX_CANDIDATES = int(os.environ.get('ROLE_INDEX_CANDIDATES', '50'))
+_role_index = None
+
+
+def _role_index_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"role_index_{key}.npz")
+
+
+def _build_role_vectors(roles: List[Dict], ontology_path: str):
+    """Mean-pooled embedding of each role's required + soft skill names"""
+    np = _import_numpy()
+    
+    vectors = np.zeros((len(roles), EMBEDDING_DIM), dtype=np.float32)
+    for i, role in enumerate(roles):
+        embeddings = embed_skills(role['required_skills'] + role['soft_skills'], ontology_path)
+        if len(embeddings):
+            vectors[i] = np.mean(embeddings, axis=0)
+    return vectors
+
+
+def get_role_index(role_clusters_path: str = "data/ai_role_clusters.json",
+                   ontology_path: str = "data/skill_ontology.json") -> Dict:
+    """
+    Load (or build) the role vector index
+    
+    The index is keyed by a content hash of the role catalog, the ontology and
+    the model name. It is kept in memory, persisted under CACHE_DIR and only
+    rebuilt when one of its inputs changes.
+    
+    When only new roles were appended to the catalog, the vectors of the
+    existing roles are reused and only the new ones are added to the
+    nearest-neighbour index.
+    
+    Returns:
+        Dictionary with 'key', 'role_ids', 'vectors' (roles x dim),
+        'unit_vectors' (row-normalised vectors used for cosine similarity) and
+        'ann' (vector_index index over the unit vectors, None for 'exact')
+    """
+    global _role_index
+    np = _import_numpy()
+    
+    key = _catalog_fingerprint(role_clusters_path, ontology_path, extra=embedding_model_id())
+    if _role_index is not None and _role_index['key'] == key:
+        return _role_index
+    
+    roles = load_role_clusters(role_clusters_path)
+    role_ids = [role['role_id'] for role in roles]
+    signatures = [role['required_skills'] + role['soft_skills'] for role in roles]
+    base_key = _catalog_fingerprint(ontology_path, extra=embedding_model_id())
+    path = _role_index_path(key)
+    
+    # Roles appended to an otherwise unchanged catalog extend the previous index
+    previous = _role_index
+    reused = 0
+    if (previous is not None and previous['base_key'] == base_key
+            and previous['signatures'] == signatures[:len(previous['signatures'])]):
+        reused = len(previous['signatures'])
+    
+    vectors = None
+    if os.path.exists(path):
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if list(data['role_ids']) == role_ids:
+                    vectors = data['vectors']
+        except Exception as e:
+            print(f"Ignoring unreadable role index {path}: {e}")
+    
+    if vectors is None:
+        if reused:
+            vectors = np.concatenate([previous['vectors'], _build_role_vectors(roles[reused:], ontology_path)])
+        else:
+            vectors = _build_role_vectors(roles, ontology_path)
+        try:
+            _save_npz_atomic(path, role_ids=np.array(role_ids), vectors=vectors)
+        except OSError as e:
+            print(f"Could not persist role index: {e}")
+    
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit_vectors = vectors / np.where(norms == 0, 1, norms)
+    
+    ann = None
+    if ROLE_INDEX_BACKEND != 'exact':
+        from vector_index import make_index
+        if reused and previous['ann'] is not None:
+            ann = previous['ann']
+            if len(unit_vectors) > reused:
+                ann.add(unit_vectors[reused:])
+        else:
+            ann = make_index(ROLE_INDEX_BACKEND, EMBEDDING_DIM)
+            ann.add(unit_vectors)
+    
+    _role_index = {
+        'key': key,
+        'base_key': base_key,
+        'role_ids': role_ids,
+        'signatures': signatures,
+        'vectors': vectors,
+        'unit_vectors': unit_vectors,
+        'ann': ann
+    }
+    return _role_index
+
+
+def missing_precomputed_indexes(role_clusters_path: str = "data/ai_role_clusters.json",
+                                ontology_path: str = "data/skill_ontology.json") -> List[str]:
+    """
+    Paths of the precompute.py embedding artefacts that do not exist yet
+    
+    get_skill_embedding_table and get_role_index build missing artefacts with
+    the embedding model; callers that must not load it can check this first.
+    """
+    model_id = embedding_model_id()
+    paths = [
+        _skill_table_path(_catalog_fingerprint(ontology_path, extra=model_id)),
+        _role_index_path(_catalog_fingerprint(role_clusters_path, ontology_path, extra=model_id))
+    ]
+    return [path for path in paths if not os.path.exists(path)]
+
+
+def _unit_vector(vector):
+    """Normalise a vector, leaving the zero vector unchanged"""
+    np = _import_numpy()
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def _top_k_indices(scores, k: int):
+    """Indices of the k highest scores, best first, ties in index order like a stable sort"""
+    np = _import_numpy()
+    scores = np.asarray(scores)
+    if k >= len(scores):
+        return np.argsort(-scores, kind='stable')[:k]
+    
+    # Keep every score tied with the k-th so ties resolve exactly as in a full sort
+    kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+    selected = np.flatnonzero(scores >= kth)
+    return selected[np.argsort(-scores[selected], kind='stable')][:k]
+
+
+def _build_role_sizes(roles: List[Dict]):
+    np = _import_numpy()
+    return np.array([len(skill_set) for skill_set in _build_role_skill_sets(roles)])
+
+
+def _select_top_roles(candidates, similarities, user_skill_set: set,
+                      role_clusters_path: str, top_k: int) -> List[Tuple]:
+    """
+    Exact top_k roles by combined score, visiting as few roles as possible
+    
+    Coverage of a role R is at most min(1, n / |R|) for n user skills that
+    appear anywhere in the role catalog, so 0.7 * similarity + 0.3 * that is an
+    upper bound on the combined score. Roles are visited in order of this bound
+    and a size-k min-heap keeps the best exact scores; once the next bound is
+    below the k-th score no remaining role can enter the top k.
+    
+    Returns:
+        (combined_score, -role_index, position, coverage, matched_skills)
+        tuples, best first, ties in catalog order
+    """
+    import heapq
+    np = _import_numpy()
+    
+    role_skill_sets = _catalog_lookup(role_clusters_path, 'role_skill_sets', _build_role_skill_sets)
+    role_sizes = _catalog_lookup(role_clusters_path, 'role_skill_sizes', _build_role_sizes)
+    postings = _catalog_lookup(role_clusters_path, 'skill_role_postings', _build_skill_role_postings)
+    
+    candidates = np.asarray(candidates, dtype=np.int64)
+    sizes = role_sizes[candidates]
+    known = sum(1 for skill in user_skill_set if skill in postings)
+    coverage_bound = np.where(sizes == 0, 0.0, np.minimum(1.0, known / np.where(sizes == 0, 1, sizes)))
+    bounds = 0.7 * np.asarray(similarities, dtype=np.float64) + 0.3 * coverage_bound
+    
+    heap = []
+    for pos in np.argsort(-bounds, kind='stable'):
+        # Small slack so float rounding can never prune a tie
+        if len(heap) == top_k and bounds[pos] + 1e-9 < heap[0][0]:
+            break
+        
+        r = int(candidates[pos])
+        required_skill_set = role_skill_sets[r]
+        matched_skills = user_skill_set.intersection(required_skill_set)
+        coverage = len(matched_skills) / len(required_skill_set) if required_skill_set else 0
+        entry = (0.7 * similarities[pos] + 0.3 * coverage, -r, int(pos), coverage, matched_skills)
+        
+        if len(heap) < top_k:
+            heapq.heappush(heap, entry)
+        else:
+            heapq.heappushpop(heap, entry)
+    
+    return sorted(heap, key=lambda entry: entry[:2], reverse=True)
+
+
+def match_roles(user_vector, 
+                user_skills: List[str], 
+                role_clusters_path: str = "data/ai_role_clusters.json",
+                top_k: int = 5) -> List[Dict]:
+    """
+    Match user to AI roles based on cosine similarity and skill coverage
+    
+    Returns:
+        List of top_k (default 5) matching roles with scores, gaps, and metadata
+    """
+    roles = load_role_clusters(role_clusters_path)
+    role_index = get_role_index(role_clusters_path)
+    role_skill_sets = _catalog_lookup(role_clusters_path, 'role_skill_sets', _build_role_skill_sets)
+    user_skill_set = set(user_skills)
+    unit_user_vector = _unit_vector(user_vector)
+    
+    if role_index['ann'] is None:
+        candidates = range(len(roles))
+        # Cosine similarity against every role in a single matrix-vector product
+        similarities = role_index['unit_vectors'] @ unit_user_vector
+    else:
+        # Roles near the user vector, plus every role that shares a skill with
+        # the user, since coverage can lift those past the nearest neighbours
+        postings = _catalog_lookup(role_clusters_path, 'skill_role_postings', _build_skill_role_postings)
+        nearest, _ = role_index['ann'].search(unit_user_vector, ROLE_INDEX_CANDIDATES)
+        candidates = set(int(r) for r in nearest if r < len(roles))
+        for skill in user_skill_set:
+            candidates.update(int(r) for r in postings.get(skill, ()))
+        candidates = sorted(candidates)
+        similarities = role_index['unit_vectors'][candidates] @ unit_user_vector
+    
+    # Combined score (70% similarity + 30% coverage), pruned by an upper bound
+    winners = _select_top_roles(candidates, similarities, user_skill_set, role_clusters_path, top_k)
+    
+    # Result dicts are only built for the winners
+    matched_roles = []
+    
+    for combined_score, _, pos, coverage, matched_skills in winners:
+        r = candidates[pos]
+        role = roles[r]
+        similarity = similarities[pos]
+        
+        # Identify gaps
+        gaps = list(role_skill_sets[r] - user_skill_set)
+        
+        matched_roles.append({
+            'role_id': role['role_id'],
+            'role_name': role['role_name'],
+            'description': role['description'],
+            'icon': role['icon'],
+            'similarity': float(similarity),
+            'coverage': float(coverage),
+            'combined_score': float(combined_score),
+            'gaps': gaps,
+            'matched_skills': list(matched_skills),
+            'pay_range': role['pay_range'],
+            'demand': role['demand']
+        })
+    
+    return matched_roles
+
+
+# ============================================================================
+# INCREMENTAL ROLE SCORING
+# ============================================================================
+
+def _build_skill_role_postings(roles: List[Dict]) -> Dict:
+    """Skill ID -> indices of the roles that list it"""
+    np = _import_numpy()
+    postings = {}
+    for i, skill_set in enumerate(_build_role_skill_sets(roles)):
+        for skill in skill_set:
+            postings.setdefault(skill, []).append(i)
+    return {skill: np.array(rows) for skill, rows in postings.items()}
+
+
+def get_skill_role_dots(role_clusters_path: str = "data/ai_role_clusters.json",
+                        ontology_path: str = "data/skill_ontology.json"):
+    """
+    Skills x roles matrix of skill embeddings dotted with unit role vectors
+    
+    Rows follow the skill embedding table. Summing the rows of a user's skills
+    gives the user-vector/role dot products without touching the embeddings.
+    """
+    table = get_skill_embedding_table(ontology_path)
+    role_index = get_role_index(role_clusters_path, ontology_path)
+    return _catalog_lookup(role_clusters_path, f"skill_role_dots_{role_index['key']}",
+                           lambda roles: table['vectors'] @ role_index['unit_vectors'].T)
+
+
+class IncrementalRoleScorer:
+    """
+    Role scores for a skill set that changes one skill at a time
+    
+    Keeps the running embedding sum, the skill count, the running dot product
+    with every role vector and per-role coverage counters, so adding or
+    removing a skill updates all role scores in O(roles) without re-encoding.
+    Skills are IDs or names, as for compute_user_vector + match_roles, and
+    matches() returns the same dicts as match_roles.
+    """
+    
+    def __init__(self, skills: List[str] = (),
+                 role_clusters_path: str = "data/ai_role_clusters.json",
+                 ontology_path: str = "data/skill_ontology.json"):
+        np = _import_numpy()
+        self._roles = load_role_clusters(role_clusters_path)
+        self._unit_vectors = get_role_index(role_clusters_path, ontology_path)['unit_vectors']
+        self._table = get_skill_embedding_table(ontology_path)
+        self._dots = get_skill_role_dots(role_clusters_path, ontology_path)
+        self._postings = _catalog_lookup(role_clusters_path, 'skill_role_postings', _build_skill_role_postings)
+        self._role_skill_sets = _catalog_lookup(role_clusters_path, 'role_skill_sets', _build_role_skill_sets)
+        self._role_sizes = np.array([len(s) for s in self._role_skill_sets], dtype=np.float64)
+        self._role_clusters_path = role_clusters_path
+        self._ontology_path = ontology_path
+        
+        n_roles = len(self._roles)
+        self._skills = {}
+        self._count = 0
+        self._sum = np.zeros(EMBEDDING_DIM, dtype=np.float64)
+        self._role_dots = np.zeros(n_roles, dtype=np.float64)
+        self._matched = np.zeros(n_roles, dtype=np.int64)
+        
+        for skill in skills:
+            self.add_skill(skill)
+    
+    @property
+    def skills(self) -> List[str]:
+        return list(self._skills)
+    
+    def _contribution(self, skill: str):
+        """Embedding of a skill and its dot products with the role vectors"""
+        row = self._table['rows'].get(skill)
+        if row is not None:
+            return self._table['vectors'][row], self._dots[row]
+        if is_model_free():
+            print(f"Skipping skill without precomputed embedding: {skill}")
+            return None, None
+        vector = encode_texts([skill])[0]
+        return vector, self._unit_vectors @ vector
+    
+    def add_skill(self, skill: str) -> bool:
+        """Add a skill; False if it was already present"""
+        if skill in self._skills:
+            return False
+        
+        vector, dots = self._contribution(skill)
+        self._skills[skill] = (vector, dots)
+        if vector is not None:
+            self._sum += vector
+            self._role_dots += dots
+            self._count += 1
+        
+        roles = self._postings.get(skill)
+        if roles is not None:
+            self._matched[roles] += 1
+        return True
+    
+    def remove_skill(self, skill: str) -> bool:
+        """Remove a skill; False if it was not present"""
+        if skill not in self._skills:
+            return False
+        
+        vector, dots = self._skills.pop(skill)
+        if vector is not None:
+            self._count -= 1
+            if self._count == 0:
+                # Reset instead of subtracting so rounding errors cannot accumulate
+                self._sum[:] = 0
+                self._role_dots[:] = 0
+            else:
+                self._sum -= vector
+                self._role_dots -= dots
+        
+        roles = self._postings.get(skill)
+        if roles is not None:
+            self._matched[roles] -= 1
+        return True
+    
+    def user_vector(self):
+        """Mean-pooled embedding, as compute_user_vector would return"""
+        np = _import_numpy()
+        if self._count == 0:
+            return np.zeros(EMBEDDING_DIM)
+        return (self._sum / self._count).astype(np.float32)
+    
+    def scores(self) -> Tuple:
+        """Per-role (similarity, coverage, combined score) arrays in catalog order"""
+        np = _import_numpy()
+        # Mean pooling does not change the direction, so the summed vector suffices
+        norm = np.linalg.norm(self._sum)
+        similarity = self._role_dots / norm if norm > 0 else np.zeros_like(self._role_dots)
+        coverage = self._matched / np.where(self._role_sizes == 0, 1, self._role_sizes)
+        return similarity, coverage, 0.7 * similarity + 0.3 * coverage
+    
+    def skill_gains(self):
+        """
+        Change in every role's combined score if each ontology skill were added
+        
+        One vectorised pass over the precomputed skills x roles dot products
+        and role skill matrix: ||s + e||^2 = ||s||^2 + 2 s.e + ||e||^2 gives
+        the new norm of the summed vector for every candidate at once.
+        
+        Returns:
+            Skills x roles array aligned with the skill embedding table; rows
+            of skills already held are zero
+        """
+        np = _import_numpy()
+        table = self._table
+        vectors = table['vectors']
+        sq_norms = _catalog_lookup(self._ontology_path, f"skill_sq_norms_{table['key']}",
+                                   lambda ontology: np.einsum('ij,ij->i', vectors, vectors))
+        role_skills = _catalog_lookup(self._role_clusters_path, f"role_skill_matrix_{table['key']}",
+                                      lambda roles: _role_skill_matrix(roles, table['ids']))
+        
+        _, _, combined = self.scores()
+        new_norms = np.sqrt(np.maximum(self._sum @ self._sum + 2 * (vectors @ self._sum) + sq_norms, 0))
+        new_similarity = (self._role_dots + self._dots) / np.where(new_norms == 0, 1, new_norms)[:, None]
+        new_coverage = (self._matched + role_skills.T) / np.where(self._role_sizes == 0, 1, self._role_sizes)
+        
+        gains = 0.7 * new_similarity + 0.3 * new_coverage - combined
+        held = [table['rows'][skill] for skill in self._skills if skill in table['rows']]
+        gains[held] = 0
+        return gains
+    
+    def matches(self, top_k: int = 5) -> List[Dict]:
+        """Top roles for the current skills, in the format of match_roles"""
+        similarity, coverage, combined = self.scores()
+        user_skill_set = set(self._skills)
+        
+        results = []
+        for r in _top_k_indices(combined, top_k):
+            role = self._roles[r]
+            required_skill_set = self._role_skill_sets[r]
+            results.append({
+                'role_id': role['role_id'],
+                'role_name': role['role_name'],
+                'description': role['description'],
+                'icon': role['icon'],
+                'similarity': float(similarity[r]),
+                'coverage': float(coverage[r]),
+                'combined_score': float(combined[r]),
+                'gaps': list(required_skill_set - user_skill_set),
+                'matched_skills': list(user_skill_set.intersection(required_skill_set)),
+                'pay_range': role['pay_range'],
+                'demand': role['demand']
+            })
+        return results
+
+
+def recommend_next_skills(user_skills: List[str],
+                          top_n: int = 5,
+                          target_roles: List[str] = None,
+                          role_clusters_path: str = "data/ai_role_clusters.json",
+                          ontology_path: str = "data/skill_ontology.json",
+                          microcreds_path: str = "data/microcredentials.json") -> List[Dict]:
+    """
+    Rank missing ontology skills by how much learning them raises role scores
+    
+    Args:
+        user_skills: Current skill IDs or names
+        top_n: Number of skills to return
+        target_roles: Role IDs to optimise for (defaults to the user's top 5 matches)
     
     Returns:
-        Cleaned text string
+        List of dicts with 'skill_id', 'skill_name', 'gain' (largest combined
+        score increase over the target roles), 'role_id' (the role gaining
+        most), 'role_gains' (role ID -> gain) and 'courses' (recommend_bridges
+        entries that teach the skill)
     """
-    text = ""
+    np = _import_numpy()
+    table = get_skill_embedding_table(ontology_path)
+    roles = load_role_clusters(role_clusters_path)
     
-    try:
-        if file_type == "pdf":
-            # Read PDF
-            PyPDF2 = _import_pdf()
-            pdf_reader = PyPDF2.PdfReader(BytesIO(cv_file.read()))
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-        
-        elif file_type == "docx":
-            # Read DOCX
-            Document = _import_docx()
-            doc = Document(BytesIO(cv_file.read()))
-            text = "\n".join([para.text for para in doc.paragraphs])
-        
-        # Clean text
-        text = clean_text(text)
-        
-    except Exception as e:
-        print(f"Error extracting text: {e}")
-        text = ""
+    # Coverage is counted on skill IDs, so map canonical names back to them
+    skill_ids = [table['ids'][table['rows'][s]] if s in table['rows'] else s for s in user_skills]
+    scorer = IncrementalRoleScorer(skill_ids, role_clusters_path, ontology_path)
     
-    return text
+    if target_roles is None:
+        target_roles = [match['role_id'] for match in scorer.matches()]
+    target_roles = set(target_roles)
+    cols = [i for i, role in enumerate(roles) if role['role_id'] in target_roles]
+    if not cols:
+        return []
+    
+    gains = scorer.skill_gains()[:, cols]
+    best_gain = gains.max(axis=1)
+    best_gain[[table['rows'][s] for s in scorer.skills if s in table['rows']]] = -np.inf
+    
+    rows = [row for row in np.argsort(-best_gain, kind='stable')[:top_n] if best_gain[row] > 0]
+    if not rows:
+        return []
+    
+    chosen = [table['ids'][row] for row in rows]
+    courses = recommend_bridges(chosen, skill_ids, microcreds_path)
+    names = get_skill_names(chosen, ontology_path)
+    
+    results = []
+    for row, skill_id, name in zip(rows, chosen, names):
+        results.append({
+            'skill_id': skill_id,
+            'skill_name': name,
+            'gain': float(best_gain[row]),
+            'role_id': roles[cols[int(gains[row].argmax())]]['role_id'],
+            'role_gains': {roles[c]['role_id']: float(g) for c, g in zip(cols, gains[row])},
+            'courses': [course for course in courses if skill_id in course['fills_gaps']]
+        })
+    return results
 
 
-def clean_text(text: str) -> str:
-    """
-    Clean and normalize text
-    Remove PII (email, phone, address patterns)
+# ============================================================================
+# BATCH ROLE MATCHING
+# ============================================================================
+
+def build_user_skill_matrix(user_skill_lists: List[List[str]],
+                            ontology_path: str = "data/skill_ontology.json"):
     """
-    # Remove emails
-    text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL]', text)
-    
-    # Remove phone numbers (various formats)
-    text = re.sub(r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', '[PHONE]', text)
-    
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
+    Turn per-user skill lists into a boolean user x skill indicator matrix
     
-    # Normalize bullets
-    text = re.sub(r'[•●○■◆◇▪▫]', '-', text)
+    Columns follow the ontology order of the skill embedding table. Skill IDs
+    and canonical names are both accepted; anything else is ignored.
+    """
+    np = _import_numpy()
+    table = get_skill_embedding_table(ontology_path)
     
-    return text.strip()
+    matrix = np.zeros((len(user_skill_lists), len(table['ids'])), dtype=bool)
+    for i, skills in enumerate(user_skill_lists):
+        cols = [table['rows'][skill] for skill in skills if skill in table['rows']]
+        matrix[i, cols] = True
+    return matrix
 
 
-def load_skill_ontology(filepath: str = "data/skill_ontology.json") -> Dict:
-    """Load skill ontology from JSON"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
+def _role_skill_matrix(roles: List[Dict], skill_ids: List[str]):
+    """Boolean role x skill matrix of each role's required + soft skills"""
+    np = _import_numpy()
+    col = {sid: i for i, sid in enumerate(skill_ids)}
+    
+    matrix = np.zeros((len(roles), len(skill_ids)), dtype=bool)
+    for i, role in enumerate(roles):
+        for sid in role['required_skills'] + role['soft_skills']:
+            if sid in col:
+                matrix[i, col[sid]] = True
+    return matrix
 
 
-def extract_skills(text: str, ontology_path: str = "data/skill_ontology.json") -> Dict[str, List[str]]:
+def match_roles_batch(user_skill_matrix,
+                      role_clusters_path: str = "data/ai_role_clusters.json",
+                      ontology_path: str = "data/skill_ontology.json",
+                      top_k: int = 5) -> List[List[Dict]]:
     """
-    Extract skills from text using keyword matching and patterns
+    Match many users to AI roles in one vectorised pass
     
-    Returns:
-        Dictionary with 'hard_skills' and 'soft_skills' lists
-    """
-    ontology = load_skill_ontology(ontology_path)
-    text_lower = text.lower()
+    Batch counterpart of compute_user_vector + match_roles for users described
+    by skill IDs: similarity is a normalised matrix product, coverage a boolean
+    indicator matrix product, and gaps come from the same matrices.
     
-    found_hard_skills = []
-    found_soft_skills = []
+    Args:
+        user_skill_matrix: Boolean users x skills matrix (see build_user_skill_matrix)
     
-    # Extract hard skills
-    for skill in ontology['hard_skills']:
-        for keyword in skill['keywords']:
-            if keyword.lower() in text_lower:
-                if skill['id'] not in found_hard_skills:
-                    found_hard_skills.append(skill['id'])
-                break
+    Returns:
+        One list per user of the top_k role dicts, as returned by match_roles
+    """
+    np = _import_numpy()
     
-    # Extract soft skills
-    for skill in ontology['soft_skills']:
-        for keyword in skill['keywords']:
-            if keyword.lower() in text_lower:
-                if skill['id'] not in found_soft_skills:
-                    found_soft_skills.append(skill['id'])
-                break
+    roles = load_role_clusters(role_clusters_path)
+    role_index = get_role_index(role_clusters_path, ontology_path)
+    table = get_skill_embedding_table(ontology_path)
+    skill_ids = table['ids']
+    
+    users = np.asarray(user_skill_matrix, dtype=bool)
+    role_skills = _catalog_lookup(role_clusters_path, f"role_skill_matrix_{table['key']}",
+                                  lambda roles: _role_skill_matrix(roles, skill_ids))
+    role_sizes = role_skills.sum(axis=1)
+    
+    # Mean pooling does not change the direction, so summed embeddings suffice
+    user_vectors = users.astype(np.float32) @ table['vectors']
+    norms = np.linalg.norm(user_vectors, axis=1, keepdims=True)
+    user_vectors /= np.where(norms == 0, 1, norms)
+    similarity = user_vectors @ role_index['unit_vectors'].T
+    
+    matched_counts = users.astype(np.float32) @ role_skills.T.astype(np.float32)
+    coverage = matched_counts / np.where(role_sizes == 0, 1, role_sizes)
+    
+    combined = 0.7 * similarity + 0.3 * coverage
+    
+    results = []
+    for u in range(len(users)):
+        matches = []
+        for r in _top_k_indices(combined[u], top_k):
+            role = roles[r]
+            matches.append({
+                'role_id': role['role_id'],
+                'role_name': role['role_name'],
+                'description': role['description'],
+                'icon': role['icon'],
+                'similarity': float(similarity[u, r]),
+                'coverage': float(coverage[u, r]),
+                'combined_score': float(combined[u, r]),
+                'gaps': [skill_ids[i] for i in np.flatnonzero(role_skills[r] & ~users[u])],
+                'matched_skills': [skill_ids[i] for i in np.flatnonzero(role_skills[r] & users[u])],
+                'pay_range': role['pay_range'],
+                'demand': role['demand']
+            })
+        results.append(matches)
     
+    return results
+
+
+# ============================================================================
+# ANALYSIS CACHE
+# ============================================================================
+
+# Results of the skills -> vector -> role matching pipeline, keyed by a hash of
+# the normalised text plus the catalog and model versions. A small in-memory
+# LRU sits in front of an optional SQLite file shared across sessions/restarts.
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', '256'))
+ANALYSIS_CACHE_TTL = float(os.environ.get('ANALYSIS_CACHE_TTL', str(7 * 24 * 3600)))
+ANALYSIS_CACHE_DB = os.environ.get('ANALYSIS_CACHE_DB', '')
+ANALYSIS_CACHE_DB_MAX_BYTES = int(os.environ.get('ANALYSIS_CACHE_DB_MAX_BYTES', str(64 * 1024 * 1024)))
+
+_analysis_cache = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+
+
+def _analysis_key(text: str,
+                  ontology_path: str = "data/skill_ontology.json",
+                  role_clusters_path: str = "data/ai_role_clusters.json") -> str:
+    # Skill extraction is case-insensitive and whitespace-agnostic
+    normalized = re.sub(r'\s+', ' ', text).strip().lower()
+    version = _catalog_fingerprint(ontology_path, role_clusters_path, extra=embedding_model_id())
+    return hashlib.sha256(f"{version}\0{normalized}".encode('utf-8')).hexdigest()
+
+
+def _analysis_db():
+    import sqlite3
+    conn = sqlite3.connect(ANALYSIS_CACHE_DB, timeout=5)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS analysis_cache ("
+        "key TEXT PRIMARY KEY, payload BLOB, size INTEGER, created REAL, accessed REAL)"
+    )
+    return conn
+
+
+def _analysis_db_get(key: str):
+    now = time.time()
+    conn = _analysis_db()
+    try:
+        with conn:
+            row = conn.execute(
+                "SELECT payload, created FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > ANALYSIS_CACHE_TTL:
+                conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE analysis_cache SET accessed = ? WHERE key = ?", (now, key))
+        return row[1], json.loads(row[0])
+    finally:
+        conn.close()
+
+
+def _analysis_db_put(key: str, created: float, payload: Dict):
+    blob = json.dumps(payload).encode('utf-8')
+    conn = _analysis_db()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), created, created)
+            )
+            conn.execute("DELETE FROM analysis_cache WHERE created < ?", (time.time() - ANALYSIS_CACHE_TTL,))
+            
+            # Evict least recently used rows once the table exceeds its byte budget
+            total = 0
+            stale = []
+            for row_key, size in conn.execute("SELECT key, size FROM analysis_cache ORDER BY accessed DESC"):
+                total += size
+                if total > ANALYSIS_CACHE_DB_MAX_BYTES:
+                    stale.append((row_key,))
+            conn.executemany("DELETE FROM analysis_cache WHERE key = ?", stale)
+    finally:
+        conn.close()
+
+
+def _analysis_from_payload(payload: Dict) -> Dict:
+    """Fresh copy of a cached analysis, safe for callers to modify"""
+    np = _import_numpy()
     return {
-        'hard_skills': found_hard_skills,
-        'soft_skills': found_soft_skills
+        'skills': copy.deepcopy(payload['skills']),
+        'user_vector': np.array(payload['user_vector'], dtype=np.float32),
+        'matches': copy.deepcopy(payload['matches'])
     }
 
 
-def get_skill_names(skill_ids: List[str], ontology_path: str = "data/skill_ontology.json") -> List[str]:
-    """Convert skill IDs to readable names"""
-    ontology = load_skill_ontology(ontology_path)
+def analyze_text(text: str) -> Dict:
+    """
+    Run skill extraction, user vector and role matching for a text, with caching
     
-    skill_map = {}
-    for skill in ontology['hard_skills']:
-        skill_map[skill['id']] = skill['name']
-    for skill in ontology['soft_skills']:
-        skill_map[skill['id']] = skill['name']
+    Re-analysing a known document (same normalised text, same catalogs and
+    model) only costs a hash lookup.
     
-    return [skill_map.get(sid, sid) for sid in skill_ids]
+    Returns:
+        Dictionary with 'skills', 'user_vector' and 'matches'
+    """
+    key = _analysis_key(text)
+    now = time.time()
+    
+    with _analysis_cache_lock:
+        cached = _analysis_cache.get(key)
+        if cached is not None and now - cached[0] > ANALYSIS_CACHE_TTL:
+            del _analysis_cache[key]
+            cached = None
+        if cached is not None:
+            _analysis_cache.move_to_end(key)
+            return _analysis_from_payload(cached[1])
+    
+    if ANALYSIS_CACHE_DB:
+        try:
+            cached = _analysis_db_get(key)
+        except Exception as e:
+            print(f"Analysis cache lookup failed: {e}")
+    
+    if cached is None:
+        skills = extract_skills(text)
+        all_skill_ids = skills['hard_skills'] + skills['soft_skills']
+        user_vector = compute_user_vector(all_skill_ids)
+        matches = match_roles(user_vector, get_skill_names(all_skill_ids))
+        
+        payload = {
+            'skills': skills,
+            'user_vector': [float(x) for x in user_vector],
+            'matches': matches
+        }
+        cached = (now, payload)
+        
+        if ANALYSIS_CACHE_DB:
+            try:
+                _analysis_db_put(key, now, payload)
+            except Exception as e:
+                print(f"Analysis cache write failed: {e}")
+    
+    with _analysis_cache_lock:
+        _analysis_cache[key] = cached
+        _analysis_cache.move_to_end(key)
+        while len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+    
+    return _analysis_from_payload(cached[1])
 
 
-def compute_user_vector(skills: List[str]):
+def load_microcredentials(filepath: str = "data/microcredentials.json") -> List[Dict]:
+    """Load micro-credential courses"""
+    return _load_catalog(filepath)['data']
+
+
+def _as_number(value) -> float:
+    """Numeric value of a catalog field such as cost ("Free", "$49" or 49)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(r'\d+(?:\.\d+)?', str(value).replace(',', ''))
+    return float(match.group()) if match else 0.0
+
+
+def _build_course_index(courses: List[Dict]) -> Dict:
     """
-    Compute user skill embedding using Sentence-BERT
-    
-    Args:
-        skills: List of skill IDs or names
+    Inverted skill -> course index over the micro-credential catalog
     
     Returns:
-        Mean-pooled embedding vector
+        Dictionary with 'postings' (skill ID -> course positions, catalog
+        order), per-course 'bridges_to' / 'bridges_from' sets and numeric
+        'hours' and 'cost' lists
     """
-    np = _import_numpy()
+    postings = {}
+    for i, course in enumerate(courses):
+        for skill in dict.fromkeys(course['bridges_to']):
+            postings.setdefault(skill, []).append(i)
     
-    if not skills:
-        return np.zeros(384)  # Default embedding size for MiniLM
-    
-    model = get_embedding_model()
-    
-    # Get skill names
-    skill_names = get_skill_names(skills)
-    
-    # Compute embeddings
-    embeddings = model.encode(skill_names)
-    
-    # Mean pooling
-    user_vector = np.mean(embeddings, axis=0)
+    return {
+        'postings': postings,
+        'bridges_to': [set(course['bridges_to']) for course in courses],
+        'bridges_from': [set(course['bridges_from']) for course in courses],
+        'hours': [_as_number(course['duration_hours']) for course in courses],
+        'cost': [_as_number(course['cost']) for course in courses]
+    }
+
+
+def get_course_index(microcreds_path: str = "data/microcredentials.json") -> Dict:
+    """Course index of the current micro-credential catalog (rebuilt when the file changes)"""
+    return _catalog_lookup(microcreds_path, 'course_index', _build_course_index)
+
+
+# ============================================================================
+# BRIDGE PLAN TABLE
+# ============================================================================
+
+# The course ranking for a gap set does not depend on the user except through
+# the has_prerequisites flag, and most users share gap sets with other users
+# of the same role. precompute.py therefore stores the efficiency-ranked course
+# list for every common (role, gap set) combination, keyed by the catalog
+# version; other gap sets are ranked on first use and memoized. Plans keep only
+# the best BRIDGE_PLAN_LENGTH courses, so each entry stays small on large
+# catalogs; a user the truncated plan cannot serve is ranked directly.
+BRIDGE_PLAN_MAX_SUBSETS = int(os.environ.get('BRIDGE_PLAN_MAX_SUBSETS', '4096'))
+BRIDGE_PLAN_LENGTH = int(os.environ.get('BRIDGE_PLAN_LENGTH', '50'))
+BRIDGE_PLAN_CACHE_SIZE = int(os.environ.get('BRIDGE_PLAN_CACHE_SIZE', '4096'))
+
+_bridge_plans = None
+_bridge_plan_misses = OrderedDict()
+_bridge_plan_lock = threading.Lock()
+
+
+def _bridge_plan_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"bridge_plans_{key}.json")
+
+
+def _gap_key(gaps) -> str:
+    return "|".join(sorted(set(gaps)))
+
+
+def _meets_prerequisites(index: Dict, i: int, user_skill_set: set) -> bool:
+    bridges_from_set = index['bridges_from'][i]
+    return not bridges_from_set or not bridges_from_set.isdisjoint(user_skill_set)
+
+
+def _rank_bridge_courses(gap_set: set, microcreds_path: str,
+                         limit: int = None, user_skill_set: set = None) -> List[int]:
+    """
+    Positions of the courses touching the gaps, by efficiency then catalog order
     
-    return user_vector
+    With user_skill_set, courses whose prerequisites the user lacks come after
+    the others. With limit, only the best `limit` positions are selected.
+    """
+    import heapq
+    index = get_course_index(microcreds_path)
+    
+    # Number of gaps each touched course fills, straight from the postings
+    gaps_filled = {}
+    for skill in gap_set:
+        for i in index['postings'].get(skill, ()):
+            gaps_filled[i] = gaps_filled.get(i, 0) + 1
+    
+    def rank_key(i):
+        key = (-gaps_filled[i] / (index['hours'][i] + 1), i)
+        if user_skill_set is None:
+            return key
+        return (not _meets_prerequisites(index, i, user_skill_set),) + key
+    
+    if limit is None:
+        return sorted(gaps_filled, key=rank_key)
+    return heapq.nsmallest(limit, gaps_filled, key=rank_key)
 
 
-def load_role_clusters(filepath: str = "data/ai_role_clusters.json") -> List[Dict]:
-    """Load AI role clusters"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
+def _common_gap_sets(roles: List[Dict]):
+    """Gap sets users of each role can have, largest gaps first within a size budget"""
+    from itertools import combinations
+    
+    for skill_set in _build_role_skill_sets(roles):
+        skills = sorted(skill_set)
+        emitted = 0
+        # Gaps are the role's skills minus the user's, so walk subsets by how
+        # many role skills the user already has
+        for held in range(len(skills) + 1):
+            for have in combinations(skills, held):
+                if emitted >= BRIDGE_PLAN_MAX_SUBSETS:
+                    break
+                gaps = skill_set.difference(have)
+                if gaps:
+                    emitted += 1
+                    yield gaps
 
 
-def match_roles(user_vector, 
-                user_skills: List[str], 
-                role_clusters_path: str = "data/ai_role_clusters.json") -> List[Dict]:
+def build_bridge_plan_table(role_clusters_path: str = "data/ai_role_clusters.json",
+                            microcreds_path: str = "data/microcredentials.json") -> str:
     """
-    Match user to AI roles based on cosine similarity and skill coverage
+    Rank the bridge courses for every common (role, gap set) combination
     
     Returns:
-        List of top 5 matching roles with scores, gaps, and metadata
+        Path of the written table
     """
-    np = _import_numpy()
-    cosine_similarity = _import_cosine_similarity()
-    
     roles = load_role_clusters(role_clusters_path)
-    model = get_embedding_model()
-    
-    matched_roles = []
-    
-    for role in roles:
-        # Get required skills
-        required_skills = role['required_skills'] + role['soft_skills']
-        
-        # Compute role vector
-        skill_names = get_skill_names(required_skills)
-        role_embeddings = model.encode(skill_names)
-        role_vector = np.mean(role_embeddings, axis=0)
-        
-        # Compute cosine similarity
-        similarity = cosine_similarity(
-            user_vector.reshape(1, -1),
-            role_vector.reshape(1, -1)
-        )[0][0]
-        
-        # Compute skill coverage
-        user_skill_set = set(user_skills)
-        required_skill_set = set(required_skills)
-        
-        matched_skills = user_skill_set.intersection(required_skill_set)
-        coverage = len(matched_skills) / len(required_skill_set) if required_skill_set else 0
-        
-        # Identify gaps
-        gaps = list(required_skill_set - user_skill_set)
-        
-        # Combined score (70% similarity + 30% coverage)
-        combined_score = 0.7 * similarity + 0.3 * coverage
-        
-        matched_roles.append({
-            'role_id': role['role_id'],
-            'role_name': role['role_name'],
-            'description': role['description'],
-            'icon': role['icon'],
-            'similarity': float(similarity),
-            'coverage': float(coverage),
-            'combined_score': float(combined_score),
-            'gaps': gaps,
-            'matched_skills': list(matched_skills),
-            'pay_range': role['pay_range'],
-            'demand': role['demand']
-        })
-    
-    # Sort by combined score
-    matched_roles.sort(key=lambda x: x['combined_score'], reverse=True)
+    key = _catalog_fingerprint(microcreds_path)
+    
+    plans = {}
+    for gap_set in _common_gap_sets(roles):
+        gap_key = _gap_key(gap_set)
+        if gap_key not in plans:
+            plans[gap_key] = _rank_bridge_courses(gap_set, microcreds_path, BRIDGE_PLAN_LENGTH)
+    
+    path = _bridge_plan_path(key)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'key': key, 'plans': plans}, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def get_bridge_plans(microcreds_path: str = "data/microcredentials.json") -> Dict:
+    """
+    Precomputed bridge plans for the current course catalog
     
-    return matched_roles[:5]
+    Returns:
+        Dictionary with 'key' and 'plans' (sorted, |-joined gap IDs -> ranked
+        course positions); empty plans when precompute.py has not been run
+    """
+    global _bridge_plans
+    
+    key = _catalog_fingerprint(microcreds_path)
+    if _bridge_plans is not None and _bridge_plans['key'] == key:
+        return _bridge_plans
+    
+    plans = {}
+    path = _bridge_plan_path(key)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                plans = {gap_key: plan[:BRIDGE_PLAN_LENGTH] for gap_key, plan in json.load(f)['plans'].items()}
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable bridge plan table {path}: {e}")
+    
+    with _bridge_plan_lock:
+        _bridge_plan_misses.clear()
+    _bridge_plans = {'key': key, 'plans': plans}
+    return _bridge_plans
 
 
-def load_microcredentials(filepath: str = "data/microcredentials.json") -> List[Dict]:
-    """Load micro-credential courses"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
+def _bridge_plan(gap_set: set, microcreds_path: str) -> List[int]:
+    """Ranked course positions for a gap set: table lookup, else ranked once and memoized"""
+    table = get_bridge_plans(microcreds_path)
+    gap_key = _gap_key(gap_set)
+    
+    plan = table['plans'].get(gap_key)
+    if plan is not None:
+        return plan
+    
+    with _bridge_plan_lock:
+        plan = _bridge_plan_misses.get(gap_key)
+        if plan is not None:
+            _bridge_plan_misses.move_to_end(gap_key)
+            return plan
+    
+    plan = _rank_bridge_courses(gap_set, microcreds_path, BRIDGE_PLAN_LENGTH)
+    with _bridge_plan_lock:
+        _bridge_plan_misses[gap_key] = plan
+        while len(_bridge_plan_misses) > BRIDGE_PLAN_CACHE_SIZE:
+            _bridge_plan_misses.popitem(last=False)
+    return plan
 
 
 def recommend_bridges(gaps: List[str], 
                      user_skills: List[str],
-                     microcreds_path: str = "data/microcredentials.json") -> List[Dict]:
+                     microcreds_path: str = "data/microcredentials.json",
+                     limit: int = None) -> List[Dict]:
     """
     Recommend micro-credential bridge courses to fill skill gaps
     
+    The efficiency ranking for the gap set comes from the bridge plan table;
+    only the prerequisite check is done per user.
+    
     Args:
         gaps: List of missing skill IDs
         user_skills: List of current user skill IDs
+        limit: Return only the best `limit` courses
     
     Returns:
         List of recommended courses (sorted by efficiency)
@@ -303,67 +2189,420 @@ def recommend_bridges(gaps: List[str],
         return []
     
     courses = load_microcredentials(microcreds_path)
+    index = get_course_index(microcreds_path)
     user_skill_set = set(user_skills)
     gap_set = set(gaps)
     
+    # Courses whose prerequisites the user meets come first; the plan is
+    # already in efficiency order, so a stable partition keeps the ranking
+    plan = _bridge_plan(gap_set, microcreds_path)
+    ready, not_ready = [], []
+    for i in plan:
+        if _meets_prerequisites(index, i, user_skill_set):
+            ready.append(i)
+            if limit is not None and len(ready) >= limit:
+                break
+        elif limit is None or len(not_ready) < limit:
+            not_ready.append(i)
+    ranked = (ready + not_ready)[:limit] if limit is not None else ready + not_ready
+    
+    if len(plan) >= BRIDGE_PLAN_LENGTH and (limit is None or len(ready) < limit):
+        # The plan was truncated before it settled this user's list
+        ranked = _rank_bridge_courses(gap_set, microcreds_path, limit, user_skill_set)
+    
     recommended = []
+    for i in ranked:
+        course = courses[i]
+        has_prerequisites = _meets_prerequisites(index, i, user_skill_set)
+        relevant_gaps = index['bridges_to'][i].intersection(gap_set)
+        gaps_filled = len(relevant_gaps)
+        
+        # Calculate efficiency score
+        efficiency = gaps_filled / (index['hours'][i] + 1)
+        
+        recommended.append({
+            'course_id': course['course_id'],
+            'course_name': course['course_name'],
+            'description': course['description'],
+            'duration_hours': course['duration_hours'],
+            'cost': course['cost'],
+            'provider': course['provider'],
+            'url': course['url'],
+            'fills_gaps': list(relevant_gaps),
+            'gaps_count': gaps_filled,
+            'has_prerequisites': has_prerequisites,
+            'efficiency': efficiency,
+            'priority': 'High' if has_prerequisites and gaps_filled >= 2 else 'Medium'
+        })
+    
+    return recommended
+
+
+# ============================================================================
+# COURSE BUNDLE PLANNER
+# ============================================================================
+
+# Weighted set cover over the micro-credential catalog: the cheapest set of
+# courses (by hours or cost) that teaches every gap skill. Small gap sets are
+# solved exactly with a bitmask DP, larger ones (or a blown time budget) fall
+# back to the greedy H(n)-approximation. Plans are memoized per catalog version,
+# except greedy fallbacks caused by the time budget.
+BUNDLE_EXACT_MAX_GAPS = int(os.environ.get('BUNDLE_EXACT_MAX_GAPS', '14'))
+BUNDLE_TIME_BUDGET = float(os.environ.get('BUNDLE_TIME_BUDGET', '0.5'))
+BUNDLE_CACHE_SIZE = int(os.environ.get('BUNDLE_CACHE_SIZE', '1024'))
+
+_bundle_cache = OrderedDict()
+_bundle_cache_lock = threading.Lock()
+
+
+def _greedy_cover(masks: List[int], weights: List[Tuple], full: int) -> List[int]:
+    """Repeatedly take the course with the lowest weight per newly covered gap"""
+    chosen = []
+    covered = 0
+    while covered != full:
+        best, best_key = None, None
+        for c, mask in enumerate(masks):
+            new = bin(mask & ~covered).count('1')
+            if new:
+                key = (weights[c][0] / new, weights[c][1] / new, -new)
+                if best_key is None or key < best_key:
+                    best, best_key = c, key
+        chosen.append(best)
+        covered |= masks[best]
+    return chosen
+
+
+def _exact_cover(masks: List[int], weights: List[Tuple], full: int, deadline: float):
+    """
+    Minimum-weight cover by DP over covered-gap bitmasks
     
-    for course in courses:
-        # Check if course bridges to any gap skill
-        bridges_to_set = set(course['bridges_to'])
-        relevant_gaps = bridges_to_set.intersection(gap_set)
+    Each state only branches on courses covering its lowest uncovered gap, so
+    every state is reached from smaller masks. Returns None past the deadline.
+    """
+    n_bits = full.bit_length()
+    by_bit = [[c for c, mask in enumerate(masks) if mask >> b & 1] for b in range(n_bits)]
+    size = full + 1
+    cost = [None] * size
+    parent = [None] * size
+    cost[0] = (0.0, 0.0)
+    
+    for state in range(size):
+        if cost[state] is None or state == full:
+            continue
+        if state & 0xFF == 0 and time.perf_counter() > deadline:
+            return None
         
-        if relevant_gaps:
-            # Check prerequisites
-            bridges_from_set = set(course['bridges_from'])
-            has_prerequisites = True
-            
-            if bridges_from_set:
-                has_prerequisites = bool(bridges_from_set.intersection(user_skill_set))
-            
-            # Calculate efficiency score
-            gaps_filled = len(relevant_gaps)
-            efficiency = gaps_filled / (course['duration_hours'] + 1)
-            
-            recommended.append({
-                'course_id': course['course_id'],
-                'course_name': course['course_name'],
-                'description': course['description'],
-                'duration_hours': course['duration_hours'],
-                'cost': course['cost'],
-                'provider': course['provider'],
-                'url': course['url'],
-                'fills_gaps': list(relevant_gaps),
-                'gaps_count': gaps_filled,
-                'has_prerequisites': has_prerequisites,
-                'efficiency': efficiency,
-                'priority': 'High' if has_prerequisites and gaps_filled >= 2 else 'Medium'
-            })
+        missing = full & ~state
+        bit = (missing & -missing).bit_length() - 1
+        base = cost[state]
+        for c in by_bit[bit]:
+            nxt = state | masks[c]
+            candidate = (base[0] + weights[c][0], base[1] + weights[c][1])
+            if cost[nxt] is None or candidate < cost[nxt]:
+                cost[nxt] = candidate
+                parent[nxt] = (state, c)
+    
+    chosen = []
+    state = full
+    while state:
+        state, c = parent[state]
+        chosen.append(c)
+    return chosen[::-1]
+
+
+def plan_course_bundle(gaps: List[str],
+                       user_skills: List[str] = (),
+                       weight: str = 'hours',
+                       require_prerequisites: bool = False,
+                       microcreds_path: str = "data/microcredentials.json",
+                       time_budget: float = None) -> Dict:
+    """
+    Cheapest set of courses that together cover a set of skill gaps
     
-    # Sort by efficiency and priority
-    recommended.sort(key=lambda x: (x['has_prerequisites'], x['efficiency']), reverse=True)
+    Args:
+        gaps: Missing skill IDs
+        user_skills: Current skill IDs (used for prerequisites)
+        weight: 'hours' or 'cost' to minimise; the other breaks ties
+        require_prerequisites: Only use courses whose prerequisites the user meets
+        time_budget: Seconds allowed for the exact solver (default BUNDLE_TIME_BUDGET)
     
-    return recommended
+    Returns:
+        Dictionary with 'courses' (in plan order), 'total_hours', 'total_cost',
+        'covered' and 'uncovered' gap IDs, and 'method' ('exact' or 'greedy')
+    """
+    if weight not in ('hours', 'cost'):
+        raise ValueError(f"weight must be 'hours' or 'cost', got {weight!r}")
+    
+    courses = load_microcredentials(microcreds_path)
+    index = get_course_index(microcreds_path)
+    user_skill_set = set(user_skills)
+    gap_list = sorted(set(gaps))
+    
+    eligible = sorted({i for skill in gap_list for i in index['postings'].get(skill, ())})
+    if require_prerequisites:
+        eligible = [i for i in eligible
+                    if not index['bridges_from'][i] or not index['bridges_from'][i].isdisjoint(user_skill_set)]
+    
+    key = (tuple(gap_list), tuple(eligible), weight, catalog_version(microcreds_path))
+    with _bundle_cache_lock:
+        if key in _bundle_cache:
+            _bundle_cache.move_to_end(key)
+            return copy.deepcopy(_bundle_cache[key])
+    
+    # Gaps no eligible course teaches are reported rather than planned for
+    taught = set().union(*(index['bridges_to'][i] for i in eligible)) if eligible else set()
+    covered = [skill for skill in gap_list if skill in taught]
+    bit = {skill: b for b, skill in enumerate(covered)}
+    full = (1 << len(covered)) - 1
+    
+    # Keep the cheapest course for each distinct coverage mask
+    options = {}
+    for i in eligible:
+        mask = sum(1 << bit[skill] for skill in index['bridges_to'][i] if skill in bit)
+        primary, secondary = index[weight][i], index['cost' if weight == 'hours' else 'hours'][i]
+        if mask and (mask not in options or (primary, secondary) < options[mask][1]):
+            options[mask] = (i, (primary, secondary))
+    course_ids = [i for i, _ in options.values()]
+    masks = list(options)
+    weights = [w for _, w in options.values()]
+    
+    chosen, method = [], 'exact'
+    timed_out = False
+    if full:
+        if len(covered) <= BUNDLE_EXACT_MAX_GAPS:
+            budget = BUNDLE_TIME_BUDGET if time_budget is None else time_budget
+            chosen = _exact_cover(masks, weights, full, time.perf_counter() + budget)
+            timed_out = chosen is None
+        if not chosen:
+            chosen, method = _greedy_cover(masks, weights, full), 'greedy'
+    
+    bundle = []
+    for c in chosen:
+        course = courses[course_ids[c]]
+        bundle.append({
+            'course_id': course['course_id'],
+            'course_name': course['course_name'],
+            'description': course['description'],
+            'duration_hours': course['duration_hours'],
+            'cost': course['cost'],
+            'provider': course['provider'],
+            'url': course['url'],
+            'fills_gaps': [skill for skill in covered if masks[c] >> bit[skill] & 1]
+        })
+    
+    plan = {
+        'courses': bundle,
+        'total_hours': sum(index['hours'][course_ids[c]] for c in chosen),
+        'total_cost': sum(index['cost'][course_ids[c]] for c in chosen),
+        'covered': covered,
+        'uncovered': [skill for skill in gap_list if skill not in taught],
+        'method': method
+    }
+    
+    # A greedy fallback after a timeout is not cached: a later call with a
+    # bigger time budget may still find the exact plan
+    if not timed_out:
+        with _bundle_cache_lock:
+            _bundle_cache[key] = plan
+            while len(_bundle_cache) > BUNDLE_CACHE_SIZE:
+                _bundle_cache.popitem(last=False)
+    return copy.deepcopy(plan)
+
+
+# ============================================================================
+# LEARNING PATH PLANNER
+# ============================================================================
+
+# Courses are edges of a skill graph: taking a course needs any one of its
+# bridges_from skills (or nothing, modelled as edges from a virtual root) and
+# teaches all of its bridges_to skills. Dijkstra from the user's skills gives
+# the fewest-hours chain of courses to every reachable skill. Results only
+# depend on the user's skills that are prerequisites somewhere, so they are
+# cached per (those skills, catalog version).
+LEARNING_PATH_CACHE_SIZE = int(os.environ.get('LEARNING_PATH_CACHE_SIZE', '1024'))
+_PATH_ROOT = ''
+
+_path_cache = OrderedDict()
+_path_cache_lock = threading.Lock()
+
+
+def _build_skill_graph(courses: List[Dict]) -> Dict[str, List[int]]:
+    """Skill (or the virtual root) -> positions of the courses it unlocks"""
+    graph = {}
+    for i, course in enumerate(courses):
+        for skill in dict.fromkeys(course['bridges_from']) or [_PATH_ROOT]:
+            graph.setdefault(skill, []).append(i)
+    return graph
+
+
+def _shortest_paths(user_skills: set, microcreds_path: str) -> Tuple[Dict, Dict]:
+    """
+    Hours-weighted shortest paths from the user's skills to every skill
+    
+    Returns:
+        (dist, parent): skill -> hours, and skill -> (course position,
+        prerequisite skill) for every skill reached through a course
+    """
+    import heapq
+    
+    index = get_course_index(microcreds_path)
+    graph = _catalog_lookup(microcreds_path, 'skill_graph', _build_skill_graph)
+    sources = frozenset(skill for skill in user_skills if skill in graph)
+    
+    key = (sources, catalog_version(microcreds_path))
+    with _path_cache_lock:
+        if key in _path_cache:
+            _path_cache.move_to_end(key)
+            return _path_cache[key]
+    
+    dist = {skill: 0.0 for skill in sources}
+    dist[_PATH_ROOT] = 0.0
+    parent = {}
+    heap = [(0.0, skill) for skill in dist]
+    heapq.heapify(heap)
+    
+    while heap:
+        d, skill = heapq.heappop(heap)
+        if d > dist[skill]:
+            continue
+        for i in graph.get(skill, ()):
+            nd = d + index['hours'][i]
+            for target in index['bridges_to'][i]:
+                if nd < dist.get(target, float('inf')):
+                    dist[target] = nd
+                    parent[target] = (i, skill)
+                    heapq.heappush(heap, (nd, target))
+    
+    with _path_cache_lock:
+        _path_cache[key] = (dist, parent)
+        while len(_path_cache) > LEARNING_PATH_CACHE_SIZE:
+            _path_cache.popitem(last=False)
+    return dist, parent
+
+
+def plan_learning_path(user_skills: List[str],
+                       target_skills: List[str],
+                       microcreds_path: str = "data/microcredentials.json") -> Dict:
+    """
+    Shortest (hours-weighted) sequence of courses from the user's skills to a set of target skills
+    
+    Each target is reached along its own shortest chain of courses; shared
+    courses are taken once, and steps are ordered so that every course comes
+    after the course teaching its prerequisite.
+    
+    Args:
+        user_skills: Current skill IDs
+        target_skills: Skill IDs to reach, e.g. a role's gaps
+    
+    Returns:
+        Dictionary with 'steps' (course dicts plus 'requires', the
+        prerequisite skill used or None), 'total_hours', 'total_cost',
+        'reachable' and 'unreachable' target skills
+    """
+    courses = load_microcredentials(microcreds_path)
+    index = get_course_index(microcreds_path)
+    user_skill_set = set(user_skills)
+    dist, parent = _shortest_paths(user_skill_set, microcreds_path)
+    
+    needed = {}
+    reachable, unreachable = [], []
+    for skill in dict.fromkeys(target_skills):
+        if skill in user_skill_set:
+            continue
+        if skill not in dist:
+            unreachable.append(skill)
+            continue
+        reachable.append(skill)
+        
+        # Walk back to a skill the user has (or the root)
+        node = skill
+        while node in parent:
+            i, node = parent[node]
+            needed.setdefault(i, set()).add(node)
+    
+    def depth(skill):
+        hops = 0
+        while skill in parent:
+            skill = parent[skill][1]
+            hops += 1
+        return hops
+    
+    # A course starts once its latest prerequisite is learned; depth breaks
+    # ties left by zero-hour courses
+    start = {i: max((dist[skill], depth(skill), skill) for skill in prerequisites)
+             for i, prerequisites in needed.items()}
+    
+    steps = []
+    for i in sorted(needed, key=lambda i: (start[i][:2], i)):
+        course = courses[i]
+        steps.append({
+            'course_id': course['course_id'],
+            'course_name': course['course_name'],
+            'description': course['description'],
+            'duration_hours': course['duration_hours'],
+            'cost': course['cost'],
+            'provider': course['provider'],
+            'url': course['url'],
+            'requires': start[i][2] or None,
+            'teaches': list(course['bridges_to'])
+        })
+    
+    return {
+        'steps': steps,
+        'total_hours': sum(index['hours'][i] for i in needed),
+        'total_cost': sum(index['cost'][i] for i in needed),
+        'reachable': reachable,
+        'unreachable': unreachable
+    }
+
+
+# Passports are rendered in memory. Set PASSPORT_OUTPUT_DIR (or pass
+# output_dir) to also keep a copy on disk, one file per passport ID.
+PASSPORT_OUTPUT_DIR = os.environ.get('PASSPORT_OUTPUT_DIR', '')
+
+
+def new_passport_id() -> str:
+    """Unique passport ID: timestamp plus a random suffix"""
+    import datetime
+    import uuid
+    return f"SKP-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8].upper()}"
+
+
+def passport_path(passport_id: str, extension: str, output_dir: str = None) -> str:
+    """Disk location of a passport file in the optional output directory"""
+    return os.path.join(output_dir or PASSPORT_OUTPUT_DIR or 'output', f"skill_passport_{passport_id}.{extension}")
+
+
+def _write_passport_file(data: bytes, path: str):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
 
 
 def generate_skill_passport(user_data: Dict, 
                            skills: Dict[str, List[str]], 
                            top_roles: List[Dict],
-                           bridges: List[Dict]) -> Tuple[str, Dict]:
+                           bridges: List[Dict],
+                           output_dir: str = None) -> Tuple[BytesIO, Dict]:
     """
-    Generate a Skill Passport (JSON + PDF path)
+    Generate a Skill Passport as an in-memory JSON document
     
     Args:
         user_data: User metadata (name, email, etc.)
         skills: Dictionary with hard_skills and soft_skills
         top_roles: Matched roles
         bridges: Recommended courses
+        output_dir: Also write skill_passport_<passport_id>.json here
+            (defaults to PASSPORT_OUTPUT_DIR; nothing is written when both are empty)
     
     Returns:
-        Tuple of (json_path, passport_dict)
+        Tuple of (json_buffer, passport_dict)
     """
     # Create passport dictionary
     passport = {
+        'passport_id': new_passport_id(),
         'user_info': user_data,
         'verified_skills': {
             'hard_skills': get_skill_names(skills['hard_skills']),
@@ -398,20 +2637,24 @@ def generate_skill_passport(user_data: Dict,
         'generated_date': "2025-10-28"
     }
     
-    # Save JSON
-    os.makedirs('output', exist_ok=True)
-    json_path = 'output/skill_passport.json'
+    # Render JSON
+    data = json.dumps(passport, indent=2, ensure_ascii=False).encode('utf-8')
     
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(passport, f, indent=2, ensure_ascii=False)
+    output_dir = output_dir or PASSPORT_OUTPUT_DIR
+    if output_dir:
+        _write_passport_file(data, passport_path(passport['passport_id'], 'json', output_dir))
     
-    return json_path, passport
+    return BytesIO(data), passport
 
 
-def create_pdf_passport(passport: Dict, demographic_info: Dict = None, output_path: str = "output/skill_passport.pdf"):
+def create_pdf_passport(passport: Dict, demographic_info: Dict = None, output_dir: str = None):
     """
     Create a comprehensive, visually appealing PDF version of the skill passport
     with all demographic info, skills, role matches, and skill gaps
+    
+    The PDF is rendered into a BytesIO buffer (None on failure). With
+    output_dir (or PASSPORT_OUTPUT_DIR) set, a copy is also written to
+    skill_passport_<passport_id>.pdf there.
     """
     try:
         print("Starting PDF generation...")
@@ -427,9 +2670,9 @@ def create_pdf_passport(passport: Dict, demographic_info: Dict = None, output_pa
         print("Imports successful")
         
         # Create PDF
-        os.makedirs('output', exist_ok=True)
-        print(f"Creating PDF at: {output_path}")
-        doc = SimpleDocTemplate(output_path, pagesize=letter,
+        print("Creating PDF in memory")
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter,
                                rightMargin=0.75*inch, leftMargin=0.75*inch,
                                topMargin=1*inch, bottomMargin=0.75*inch)
         
@@ -491,7 +2734,7 @@ def create_pdf_passport(passport: Dict, demographic_info: Dict = None, output_pa
         elements.append(Spacer(1, 0.2*inch))
         
         # Date and ID
-        passport_id = f"SKP-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
+        passport_id = passport.get('passport_id') or new_passport_id()
         date_text = f"<b>Generated:</b> {datetime.datetime.now().strftime('%B %d, %Y')} | <b>Passport ID:</b> {passport_id}"
         elements.append(Paragraph(date_text, ParagraphStyle('date', parent=body_style, alignment=TA_CENTER, fontSize=9)))
         elements.append(Spacer(1, 0.3*inch))
@@ -708,9 +2951,16 @@ def create_pdf_passport(passport: Dict, demographic_info: Dict = None, output_pa
         # Build PDF
         print("Building PDF document...")
         doc.build(elements)
-        print(f"PDF created successfully at: {output_path}")
+        print("PDF created successfully")
+        
+        output_dir = output_dir or PASSPORT_OUTPUT_DIR
+        if output_dir:
+            output_path = passport_path(passport_id, 'pdf', output_dir)
+            _write_passport_file(buffer.getvalue(), output_path)
+            print(f"PDF saved to: {output_path}")
         
-        return output_path
+        buffer.seek(0)
+        return buffer
         
     except ImportError as e:
         print(f"Missing required library: {e}")
@@ -0,0 +1,237 @@
+"""
+Vector indexes for role / occupation matching
+
+match_roles only needs the roles most similar to a user vector. For the small
+AI role catalog an exact scan is the fastest option; for full occupation
+taxonomies (tens of thousands of roles) the inverted-file (IVF) index clusters
+the vectors with spherical k-means and only scans the lists whose centroids
+are closest to the query.
+
+Both backends index unit vectors, rank by inner product (cosine similarity),
+use insertion order as ids and accept incremental add() calls.
+
+Usage:
+    python vector_index.py                      # recall vs latency benchmark
+    python vector_index.py --roles 50000 --k 10 --probes 1 4 16
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+INDEX_BACKENDS = ('exact', 'ivf')
+
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k largest scores, best first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    part = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    return part[np.lexsort((part, -scores[part]))]
+
+
+class ExactIndex:
+    """Brute-force inner-product index"""
+    
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def add(self, vectors) -> np.ndarray:
+        """Append vectors; returns their ids"""
+        vectors = _normalize(vectors)
+        start, end = self._size, self._size + len(vectors)
+        if end > len(self._vectors):
+            # Grow geometrically so repeated single inserts stay amortised O(1)
+            grown = np.zeros((max(end, 2 * len(self._vectors), 16), self.dim), dtype=np.float32)
+            grown[:start] = self._vectors[:start]
+            self._vectors = grown
+        self._vectors[start:end] = vectors
+        self._size = end
+        return np.arange(start, end)
+    
+    def search(self, query, k: int):
+        """
+        Returns:
+            (ids, similarities) of the k nearest vectors, best first
+        """
+        scores = self._vectors[:self._size] @ _normalize(query)[0]
+        ids = _top_k(scores, k)
+        return ids, scores[ids]
+
+
+class IVFIndex:
+    """
+    Inverted-file index over spherical k-means clusters
+    
+    The first add() trains the centroids (n_lists defaults to about sqrt(n)).
+    Later adds go to the nearest existing centroid; once the index has grown
+    to retrain_factor times its training size the centroids are retrained.
+    Below min_train vectors the index simply scans everything.
+    """
+    
+    def __init__(self, dim: int, n_lists: int = None, n_probe: int = 8,
+                 min_train: int = 1024, retrain_factor: float = 4.0, seed: int = 0):
+        self.dim = dim
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.min_train = min_train
+        self.retrain_factor = retrain_factor
+        self._rng = np.random.default_rng(seed)
+        self._flat = ExactIndex(dim)
+        self._centroids = None
+        self._trained_size = 0
+        self._lists = []
+    
+    def __len__(self) -> int:
+        return len(self._flat)
+    
+    def _kmeans(self, vectors: np.ndarray, n_lists: int, iterations: int = 10) -> np.ndarray:
+        sample_size = min(len(vectors), 256 * n_lists)
+        sample = vectors[self._rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[self._rng.choice(sample_size, n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = ~sums.any(axis=1)
+            # Re-seed empty clusters with random sample points
+            sums[empty] = sample[self._rng.choice(sample_size, int(empty.sum()))]
+            centroids = _normalize(sums)
+        return centroids
+    
+    def _assign(self, vectors: np.ndarray, ids: np.ndarray):
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), 8192):
+            assignment[start:start + 8192] = np.argmax(vectors[start:start + 8192] @ self._centroids.T, axis=1)
+        for list_no in np.unique(assignment):
+            members = ids[assignment == list_no]
+            current = self._lists[list_no]
+            self._lists[list_no] = (np.concatenate([current[0], members]),
+                                    np.concatenate([current[1], vectors[assignment == list_no]]))
+    
+    def train(self):
+        """(Re)build centroids and inverted lists from every vector added so far"""
+        size = len(self._flat)
+        vectors = self._flat._vectors[:size]
+        n_lists = min(self.n_lists or max(1, int(np.sqrt(size))), size)
+        self._centroids = self._kmeans(vectors, n_lists)
+        self._lists = [(np.zeros(0, dtype=np.int64), np.zeros((0, self.dim), dtype=np.float32))
+                       for _ in range(n_lists)]
+        self._assign(vectors, np.arange(size))
+        self._trained_size = size
+    
+    def add(self, vectors) -> np.ndarray:
+        """Append vectors; returns their ids"""
+        ids = self._flat.add(vectors)
+        size = len(self._flat)
+        if size < self.min_train:
+            return ids
+        if self._centroids is None or size >= self.retrain_factor * self._trained_size:
+            self.train()
+        else:
+            self._assign(self._flat._vectors[ids[0]:ids[-1] + 1], ids)
+        return ids
+    
+    def search(self, query, k: int, n_probe: int = None):
+        """
+        Returns:
+            (ids, similarities) of the (approximately) k nearest vectors, best first
+        """
+        if self._centroids is None:
+            return self._flat.search(query, k)
+        
+        query = _normalize(query)[0]
+        probe = _top_k(self._centroids @ query, n_probe or self.n_probe)
+        ids = np.concatenate([self._lists[p][0] for p in probe])
+        scores = np.concatenate([self._lists[p][1] for p in probe]) @ query
+        best = _top_k(scores, k)
+        return ids[best], scores[best]
+
+
+def make_index(backend: str, dim: int, **kwargs):
+    """Create an empty index of the given backend ('exact' or 'ivf')"""
+    if backend == 'exact':
+        return ExactIndex(dim)
+    if backend == 'ivf':
+        return IVFIndex(dim, **kwargs)
+    raise ValueError(f"Vector index backend must be one of {INDEX_BACKENDS}, got {backend!r}")
+
+
+def _synthetic_catalog(n_roles: int, dim: int, n_queries: int, seed: int = 0):
+    """Clustered unit vectors standing in for an occupation taxonomy"""
+    rng = np.random.default_rng(seed)
+    families = _normalize(rng.standard_normal((max(1, n_roles // 50), dim)))
+    roles = _normalize(families[rng.integers(len(families), size=n_roles)]
+                       + 1.0 * rng.standard_normal((n_roles, dim)) / np.sqrt(dim))
+    queries = _normalize(roles[rng.integers(n_roles, size=n_queries)]
+                         + 1.5 * rng.standard_normal((n_queries, dim)) / np.sqrt(dim))
+    return roles, queries
+
+
+def benchmark(n_roles: int = 20000, dim: int = 384, n_queries: int = 200, k: int = 5,
+              probes=(1, 2, 4, 8, 16, 32)) -> list:
+    """
+    Recall@k and mean query latency of each backend on a synthetic catalog
+    
+    Returns:
+        List of dicts with 'backend', 'n_probe', 'recall' and 'latency_ms'
+    """
+    roles, queries = _synthetic_catalog(n_roles, dim, n_queries)
+    
+    def timed(index, **kwargs):
+        start = time.perf_counter()
+        found = [index.search(q, k, **kwargs)[0] for q in queries]
+        return found, 1000 * (time.perf_counter() - start) / len(queries)
+    
+    exact = ExactIndex(dim)
+    exact.add(roles)
+    truth, latency = timed(exact)
+    results = [{'backend': 'exact', 'n_probe': None, 'recall': 1.0, 'latency_ms': latency}]
+    
+    start = time.perf_counter()
+    ivf = IVFIndex(dim)
+    ivf.add(roles)
+    print(f"IVF build: {len(ivf._lists)} lists over {n_roles} roles in {time.perf_counter() - start:.2f}s")
+    
+    for n_probe in probes:
+        if n_probe > len(ivf._lists):
+            break
+        found, latency = timed(ivf, n_probe=n_probe)
+        recall = np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+        results.append({'backend': 'ivf', 'n_probe': n_probe, 'recall': float(recall), 'latency_ms': latency})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latency of the role vector indexes")
+    parser.add_argument('--roles', type=int, default=20000, help="Synthetic catalog size")
+    parser.add_argument('--queries', type=int, default=200, help="Number of queries")
+    parser.add_argument('--dim', type=int, default=384, help="Embedding dimension")
+    parser.add_argument('--k', type=int, default=5, help="Neighbours per query")
+    parser.add_argument('--probes', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32], help="IVF lists to probe")
+    args = parser.parse_args()
+    
+    results = benchmark(args.roles, args.dim, args.queries, args.k, args.probes)
+    print(f"{'backend':<8} {'n_probe':>7} {'recall@' + str(args.k):>9} {'ms/query':>9}")
+    for row in results:
+        n_probe = '-' if row['n_probe'] is None else row['n_probe']
+        print(f"{row['backend']:<8} {n_probe:>7} {row['recall']:>9.3f} {row['latency_ms']:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()